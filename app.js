@@ -38,21 +38,35 @@ document.addEventListener('DOMContentLoaded', () => {
     }
     loadMetroStations();
 
-    // Load Metro Lines (Tracks)
-    let metroLinesData = [];
-    async function loadMetroLines() {
-        try {
-            const response = await fetch('/api/metro-lines');
-            const data = await response.json();
-            if (data.lines) {
-                metroLinesData = data.lines;
-                console.log("Loaded metro lines:", metroLinesData.length);
+    // Anonymous per-browser id so the server can learn route preferences
+    function getUserId() {
+        let id = localStorage.getItem('userId');
+        if (!id) {
+            id = Math.random().toString(36).slice(2) + Date.now().toString(36);
+            localStorage.setItem('userId', id);
+        }
+        return id;
+    }
+
+    // Decode Google encoded polylines (server sends metro track geometry this way)
+    function decodePolyline(encoded) {
+        const coords = [];
+        let index = 0, lat = 0, lng = 0;
+        while (index < encoded.length) {
+            for (const axis of [0, 1]) {
+                let shift = 0, result = 0, byte;
+                do {
+                    byte = encoded.charCodeAt(index++) - 63;
+                    result |= (byte & 0x1f) << shift;
+                    shift += 5;
+                } while (byte >= 0x20);
+                const delta = (result & 1) ? ~(result >> 1) : (result >> 1);
+                if (axis === 0) lat += delta; else lng += delta;
             }
-        } catch (e) {
-            console.warn("Failed to load metro lines", e);
+            coords.push([lat / 1e5, lng / 1e5]);
         }
+        return coords;
     }
-    loadMetroLines();
 
     // Load Bus Stops
     async function loadBusStops() {
@@ -186,6 +200,7 @@ document.addEventListener('DOMContentLoaded', () => {
             }
 
             // Add Preferences
+            url += `&user_id=${encodeURIComponent(getUserId())}`;
             try {
                 const prefs = JSON.parse(localStorage.getItem('userPreferences') || '{}');
                 if (prefs.priority) url += `&preference=${encodeURIComponent(prefs.priority)}`;
@@ -346,6 +361,9 @@ document.addEventListener('DOMContentLoaded', () => {
             currentRouteLayer = null;
         }
 
+        // Only the first pick per search is fed back to the ranker
+        let choiceSent = false;
+
         routes.forEach((route, index) => {
             const card = document.createElement('div');
             card.className = 'route-card';
@@ -445,6 +463,14 @@ document.addEventListener('DOMContentLoaded', () => {
             `;
 
             card.addEventListener('click', () => {
+                if (!choiceSent && route.features) {
+                    choiceSent = true;
+                    fetch('/api/choice', {
+                        method: 'POST',
+                        headers: { 'Content-Type': 'application/json' },
+                        body: JSON.stringify({ user_id: getUserId(), chosen: index })
+                    }).catch(e => console.warn("Choice sync failed", e));
+                }
                 drawRoute(route);
                 document.querySelectorAll('.route-card').forEach(c => c.classList.remove('selected'));
                 card.classList.add('selected');
@@ -512,45 +538,16 @@ document.addEventListener('DOMContentLoaded', () => {
                     }
                 }
 
-                // 2. Metro Line Slicing from GeoJSON
-                else if (segment.mode === 'metro' && metroLinesData.length > 0) {
-                    if (segment.cachedGeometry) {
-                        latlngs = segment.cachedGeometry;
-                        // Identify color again just in case (though logical consistency suggests it should match)
-                        const lineColorHint = (segment.line_color || '').toLowerCase();
-                        if (lineColorHint.includes('purple')) color = '#9333EA';
-                        if (lineColorHint.includes('green')) color = '#16A34A';
-                    } else {
-                        // ... (Existing Metro slicing logic) ...
-                        const lineColorHint = (segment.line_color || '').toLowerCase();
-                        const targetLine = metroLinesData.find(line => line.color.toLowerCase() === lineColorHint);
-
-                        if (targetLine) {
-                            const findClosestIndex = (target, path) => {
-                                let minD = Infinity;
-                                let idx = -1;
-                                path.forEach((pt, i) => {
-                                    const d = (pt[0] - target[0]) ** 2 + (pt[1] - target[1]) ** 2;
-                                    if (d < minD) { minD = d; idx = i; }
-                                });
-                                return idx;
-                            };
-
-                            const i1 = findClosestIndex(segment.from, targetLine.path);
-                            const i2 = findClosestIndex(segment.to, targetLine.path);
-
-                            if (i1 !== -1 && i2 !== -1) {
-                                const startIdx = Math.min(i1, i2);
-                                const endIdx = Math.max(i1, i2);
-                                latlngs = targetLine.path.slice(startIdx, endIdx + 1);
-
-                                segment.cachedGeometry = latlngs; // Cache it!
-
-                                if (targetLine.color === 'purple') color = '#9333EA';
-                                if (targetLine.color === 'green') color = '#16A34A';
-                            }
-                        }
+                // 2. Metro track geometry precomputed by the server
+                else if (segment.mode === 'metro' && segment.geometry) {
+                    if (!segment.cachedGeometry) {
+                        segment.cachedGeometry = decodePolyline(segment.geometry);
                     }
+                    latlngs = segment.cachedGeometry;
+
+                    const lineColorHint = (segment.line_color || '').toLowerCase();
+                    if (lineColorHint.includes('purple')) color = '#9333EA';
+                    if (lineColorHint.includes('green')) color = '#16A34A';
                 }
 
                 newLayerGroup.addLayer(L.polyline(latlngs, { color, weight: 6, opacity: 0.9, dashArray, lineCap: 'round' }));
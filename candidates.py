@@ -0,0 +1,355 @@
+import csv
+import math
+import os
+from isochrone import WALK_KMPH, WALK_DETOUR, METRO_KMPH, METRO_WAIT_MIN
+from ranking import SAFETY_RISK
+
+ROAD_DETOUR = 1.3      # same factor search_routes uses when OSRM is down
+BUS_KMPH = 15.0
+BUS_WAIT_MIN = 10.0
+MAX_WALK_KM = 2.0      # longest first/last mile walk offered
+MIN_FEEDER_KM = 0.5    # don't suggest an auto for shorter hops
+MAX_FEEDER_KM = 6.0
+K_NEAREST = 3
+
+# Road fares: base + per km, pickup wait + minutes per road km
+ROAD_MODES = {
+    "moto": {"label": "Uber Moto", "base": 25, "per_km": 10, "pickup": 5, "min_per_km": 3.0},
+    "auto": {"label": "Namma Yatri Auto", "base": 30, "per_km": 15, "pickup": 4, "min_per_km": 2.5},
+    "cab": {"label": "Uber Go", "base": 50, "per_km": 18, "pickup": 7, "min_per_km": 2.4},
+}
+DIRECT_MODES = ["moto", "auto", "cab"]
+SAFETY = {"metro": "High", "cab": "High"}
+
+
+def load_fare_slabs(filename):
+    """[(max_km, fare)] from a Distance_km,Fare_Rupees slab table"""
+    slabs = []
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), filename)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                try:
+                    dist_str = row["Distance_km"]
+                    max_km = float('inf') if "Above" in dist_str else float(dist_str.split('-')[1])
+                    slabs.append((max_km, float(row["Fare_Rupees"])))
+                except (ValueError, IndexError):
+                    continue
+    except Exception as e:
+        print(f"Error loading fares from {filename}: {e}")
+    slabs.sort()
+    return slabs
+
+
+METRO_FARES = load_fare_slabs("namma-metro-fares.csv")
+BUS_FARES = load_fare_slabs("bmtc_standard_fares.csv")
+
+
+def slab_fare(slabs, km, default):
+    for max_km, fare in slabs:
+        if km <= max_km:
+            return fare
+    return slabs[-1][1] if slabs else default
+
+
+def haversine(coord1, coord2):
+    lat1, lon1 = math.radians(coord1[0]), math.radians(coord1[1])
+    lat2, lon2 = math.radians(coord2[0]), math.radians(coord2[1])
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371 * math.asin(math.sqrt(a))
+
+
+class Leg:
+    """
+    One leg of a trip. vec is its contribution to the objective vector
+    (minutes, cost, walk_km, risk, rides): risk is carried by the trunk or
+    direct ride (the one the route's safety rating comes from) and rides
+    counts vehicles boarded, so the ranker's transfers = rides - 1.
+    """
+    __slots__ = ("mode", "start", "end", "km", "minutes", "cost", "walk_km", "from_stop", "to_stop", "identifier",
+                 "runs", "vec")
+
+    def __init__(self, mode, start, end, km, minutes, cost, from_stop=None, to_stop=None, identifier=None,
+                 rated=False, runs=None):
+        self.mode = mode
+        self.start = start
+        self.end = end
+        self.km = km
+        self.minutes = minutes
+        self.cost = cost
+        self.walk_km = km if mode == "walk" else 0.0
+        self.from_stop = from_stop
+        self.to_stop = to_stop
+        self.identifier = identifier
+        # Metro only: one {"line", "from", "to", "km"} per line ridden
+        self.runs = runs
+        risk = SAFETY_RISK[SAFETY.get(mode, "Medium").lower()] if rated else 0.0
+        rides = 0 if mode == "walk" else len(runs) if runs else 1
+        self.vec = (minutes, cost, self.walk_km, risk, rides)
+
+
+def walk_leg(start, end, km, to_stop=None):
+    return Leg("walk", start, end, km, km * WALK_DETOUR / WALK_KMPH * 60, 0.0, to_stop=to_stop)
+
+
+def road_leg(mode, start, end, road_km, to_stop=None, rated=False):
+    fare = ROAD_MODES[mode]
+    minutes = fare["pickup"] + road_km * fare["min_per_km"]
+    return Leg(mode, start, end, road_km, minutes, fare["base"] + fare["per_km"] * road_km,
+               to_stop=to_stop, identifier=fare["label"], rated=rated)
+
+
+def access_legs(start, end, km, stop_name):
+    """First/last mile options between a trip end and a stop"""
+    legs = []
+    if km <= MAX_WALK_KM:
+        legs.append(walk_leg(start, end, km, stop_name))
+    if MIN_FEEDER_KM <= km <= MAX_FEEDER_KM:
+        legs.append(road_leg("auto", start, end, km * ROAD_DETOUR, stop_name))
+    return legs
+
+
+def trunk_leg(kind, a, b, network=None):
+    """
+    Ride between two stops. Metro trips are priced along the track from
+    the TransitNetwork metro graph, with line changes, when one is given;
+    otherwise (or if the stations aren't connected) from straight-line
+    distance.
+    """
+    start, end = [a["lat"], a["lon"]], [b["lat"], b["lon"]]
+    km = haversine(start, end)
+    if kind == "metro":
+        trip = network.metro_trip(a, b) if network is not None else None
+        if trip:
+            return Leg("metro", start, end, trip["km"], METRO_WAIT_MIN + trip["minutes"],
+                       slab_fare(METRO_FARES, trip["km"], 90.0), a["name"], b["name"], "Namma Metro",
+                       rated=True, runs=trip["runs"])
+        minutes = METRO_WAIT_MIN + km * 1.2 / METRO_KMPH * 60
+        return Leg("metro", start, end, km, minutes, slab_fare(METRO_FARES, km * 1.2, 90.0),
+                   a["name"], b["name"], "Namma Metro", rated=True)
+    common = sorted(set(a.get("routes", [])) & set(b.get("routes", [])))
+    minutes = BUS_WAIT_MIN + km * ROAD_DETOUR / BUS_KMPH * 60
+    return Leg("bus", start, end, km, minutes, slab_fare(BUS_FARES, km * ROAD_DETOUR, 30.0),
+               a["name"], b["name"], common[0] if common else "BMTC", rated=True)
+
+
+def _add(a, b):
+    return (a[0] + b[0], a[1] + b[1], a[2] + b[2], a[3] + b[3], a[4] + b[4])
+
+
+def _vector(legs):
+    vec = legs[0].vec
+    for leg in legs[1:]:
+        vec = _add(vec, leg.vec)
+    return vec
+
+
+def _min_vector(vectors):
+    return tuple(min(values) for values in zip(*vectors))
+
+
+def _covers(a, b):
+    """a is at least as good as b on every objective"""
+    return a[0] <= b[0] and a[1] <= b[1] and a[2] <= b[2] and a[3] <= b[3] and a[4] <= b[4]
+
+
+class ParetoFrontier:
+    """Non-dominated (minutes, cost, walk_km, risk, rides) options found so far"""
+
+    def __init__(self):
+        self.items = []
+
+    def covers(self, vec):
+        # Equal vectors count as covered so duplicates are dropped too.
+        # Unrolled: this is the hot loop for both pricing and pruning.
+        m, c, w, r, n = vec
+        for f, _ in self.items:
+            if f[0] <= m and f[1] <= c and f[2] <= w and f[3] <= r and f[4] <= n:
+                return True
+        return False
+
+    def add(self, vec, legs):
+        if self.covers(vec):
+            return False
+        self.items = [(f, l) for f, l in self.items if not _covers(vec, f)]
+        self.items.append((vec, legs))
+        return True
+
+
+def generate_candidates(start_coords, dest_coords, road_km, metro_ends, bus_ends, prune=True, network=None):
+    """
+    Pareto-optimal direct rides and first mile + trunk + last mile trips
+    over the nearby stops in metro_ends / bus_ends. Returns (list of leg
+    lists, stats).
+    """
+    frontier = ParetoFrontier()
+    stats = {"enumerated": 0, "priced": 0, "pruned": 0}
+
+    for mode in DIRECT_MODES:
+        legs = [road_leg(mode, start_coords, dest_coords, road_km, rated=True)]
+        stats["enumerated"] += 1
+        stats["priced"] += 1
+        frontier.add(_vector(legs), legs)
+
+    for kind, (near_start, near_dest) in (("metro", metro_ends), ("bus", bus_ends)):
+        firsts = []
+        for stop, km in near_start:
+            for leg in access_legs(start_coords, [stop["lat"], stop["lon"]], km, stop["name"]):
+                firsts.append((stop, leg))
+        lasts = []
+        for stop, km in near_dest:
+            options = access_legs([stop["lat"], stop["lon"]], dest_coords, km, None)
+            if options:
+                # Component-wise cheapest way to finish from this stop
+                lasts.append((stop, options, _min_vector([o.vec for o in options])))
+
+        # One trunk per boarding stop / alighting stop pair
+        trunks = {}
+        for a in {id(stop): stop for stop, _ in firsts}.values():
+            trunks[id(a)] = [(b, trunk_leg(kind, a, b, network), options, tail) for b, options, tail in lasts if b is not a]
+
+        # Cheapest first legs first, so the frontier tightens early
+        firsts.sort(key=lambda item: (item[1].cost, item[1].minutes))
+        for a, first in firsts:
+            ends = trunks[id(a)]
+            completions = sum(len(options) for _, _, options, _ in ends)
+            stats["enumerated"] += completions
+            if not ends:
+                continue
+
+            # Lower bound over every completion of this first leg
+            bound = _add(first.vec, _min_vector([_add(trunk.vec, tail) for _, trunk, _, tail in ends]))
+            if prune and frontier.covers(bound):
+                stats["pruned"] += completions
+                continue
+
+            for b, trunk, last_options, tail in ends:
+                partial = _add(first.vec, trunk.vec)
+                if prune and frontier.covers(_add(partial, tail)):
+                    stats["pruned"] += len(last_options)
+                    continue
+                for last in last_options:
+                    stats["priced"] += 1
+                    frontier.add(_add(partial, last.vec), [first, trunk, last])
+
+    options = [legs for _, legs in sorted(frontier.items, key=lambda item: item[0])]
+    return options, stats
+
+
+def to_route(route_id, legs, destination):
+    """Render legs in the segment format the frontend draws"""
+    segments = []
+    for i, leg in enumerate(legs):
+        target = leg.to_stop or destination
+        segment = {"mode": leg.mode, "from": leg.start, "to": leg.end}
+        if leg.mode == "walk":
+            segment.update(instruction=f"Walk to {target}", identifier=f"{round(leg.km, 1)} km")
+        elif leg.mode == "metro" and leg.runs:
+            # One segment per line so each gets its own track geometry
+            for j, run in enumerate(leg.runs):
+                a, b = run["from"], run["to"]
+                if j and leg.runs[j - 1]["to"] is not a:
+                    prev = leg.runs[j - 1]["to"]
+                    segments.append({"mode": "walk", "from": [prev["lat"], prev["lon"]], "to": [a["lat"], a["lon"]],
+                                     "instruction": f"Walk to {a['name']} to change lines",
+                                     "identifier": f"{round(haversine([prev['lat'], prev['lon']], [a['lat'], a['lon']]), 1)} km"})
+                change = f" (change at {a['name']})" if j else ""
+                segments.append({"mode": "metro", "from": [a["lat"], a["lon"]], "to": [b["lat"], b["lon"]],
+                                 "instruction": f"{run['line']} to {b['name']}{change}", "identifier": leg.identifier,
+                                 "from_stop": a["name"], "to_stop": b["name"]})
+            continue
+        elif leg.mode == "metro":
+            segment.update(instruction=f"Metro to {leg.to_stop}", identifier=leg.identifier,
+                           from_stop=leg.from_stop, to_stop=leg.to_stop)
+        elif leg.mode == "bus":
+            bus = f"Take Bus {leg.identifier}" if leg.identifier != "BMTC" else "Take Bus towards destination"
+            segment.update(instruction=bus, identifier=leg.identifier, from_stop=leg.from_stop, to_stop=leg.to_stop)
+        elif len(legs) == 1:
+            segment.update(instruction=f"Ride {leg.identifier} directly to {destination}", identifier=leg.identifier)
+        else:
+            segment.update(instruction=f"Take Auto to {target}", identifier=leg.identifier)
+        segments.append(segment)
+
+    labels = []
+    for leg in legs:
+        label = ROAD_MODES[leg.mode]["label"] if len(legs) == 1 else leg.mode.title()
+        if not labels or labels[-1] != label:
+            labels.append(label)
+
+    trunk = legs[1] if len(legs) == 3 else None
+    route = {
+        "id": route_id,
+        "mode": " + ".join(labels),
+        "duration": int(round(sum(l.minutes for l in legs))),
+        "cost": int(round(sum(l.cost for l in legs))),
+        "safety": SAFETY.get(trunk.mode if trunk else legs[0].mode, "Medium"),
+        "details": f"Via {trunk.from_stop}" if trunk else "Door to door",
+        "segments": segments,
+    }
+    if trunk and trunk.mode == "metro":
+        route["sub_costs"] = {
+            "leg1_auto": int(round(legs[0].cost)),
+            "metro": int(round(trunk.cost)),
+            "leg3_auto": int(round(legs[2].cost)),
+        }
+    return route
+
+
+if __name__ == "__main__":
+    import csv
+    import json
+    import os
+    import random
+    import time
+    from compute_pool import _STATE, init_worker, k_nearest
+
+    base_path = os.path.dirname(os.path.abspath(__file__))
+    geojson_path = os.path.join(base_path, "metro-lines-stations.geojson")
+    with open(geojson_path, encoding="utf-8") as f:
+        stations = [{"name": feature["properties"].get("Name", "Unknown Station"),
+                     "lat": feature["geometry"]["coordinates"][1], "lon": feature["geometry"]["coordinates"][0]}
+                    for feature in json.load(f)["features"] if feature["geometry"]["type"] == "Point"]
+    stops = []
+    with open(os.path.join(base_path, "bmtc-bus-stops-2012.csv"), encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            try:
+                stops.append({"name": row["NAME"], "lat": float(row["Y"]), "lon": float(row["X"]), "routes": []})
+            except ValueError:
+                continue
+
+    init_worker(stations, stops, geojson_path)
+    network = _STATE["network"]
+    random.seed(7)
+    ends = [([random.uniform(12.85, 13.05), random.uniform(77.50, 77.75)],
+             [random.uniform(12.85, 13.05), random.uniform(77.50, 77.75)]) for _ in range(500)]
+
+    for k, prune in ((K_NEAREST, False), (K_NEAREST, True), (K_NEAREST * 2, False), (K_NEAREST * 2, True)):
+        trips = [(a, b, (k_nearest(a, "metro", k), k_nearest(b, "metro", k)), (k_nearest(a, "bus", k), k_nearest(b, "bus", k)))
+                 for a, b in ends]
+        # Fill the metro trip memo first so both passes time the same work
+        for a, b, metro, bus in trips:
+            generate_candidates(a, b, haversine(a, b) * ROAD_DETOUR, metro, bus, False, network)
+        totals = {"enumerated": 0, "priced": 0, "pruned": 0}
+        frontiers = []
+        t0 = time.perf_counter()
+        for a, b, metro, bus in trips:
+            options, stats = generate_candidates(a, b, haversine(a, b) * ROAD_DETOUR, metro, bus, prune, network)
+            frontiers.append(sorted(_vector(legs) for legs in options))
+            for key in totals:
+                totals[key] += stats[key]
+        elapsed = time.perf_counter() - t0
+
+        if not prune:
+            exhaustive, exhaustive_elapsed = frontiers, elapsed
+            print(f"Trips: {len(trips)}, k = {k}, combinations: {totals['enumerated']}")
+            print(f"Exhaustive: priced {totals['priced']}, {elapsed / len(trips) * 1000:.2f} ms/trip")
+        else:
+            print(f"Pruned:     priced {totals['priced']}, skipped {totals['pruned']} "
+                  f"({totals['pruned'] / totals['enumerated']:.0%} pruning ratio), {elapsed / len(trips) * 1000:.2f} ms/trip "
+                  f"({elapsed / exhaustive_elapsed:.2f}x exhaustive time)")
+            print(f"Mean Pareto options per trip: {sum(map(len, frontiers)) / len(trips):.1f}, "
+                  f"identical to exhaustive: {frontiers == exhaustive}")
+            cab = sum(any(len(legs) == 1 and legs[0].mode == "cab" for legs in options) for options in
+                      (generate_candidates(a, b, haversine(a, b) * ROAD_DETOUR, metro, bus, prune, network)[0]
+                       for a, b, metro, bus in trips))
+            print(f"Trips offering a direct cab: {cab}/{len(trips)}")
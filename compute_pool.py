@@ -0,0 +1,169 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
+from smart_router import SmartRouter
+from metro_geometry import MetroGeometry
+from isochrone import TransitNetwork, _haversine_many
+from candidates import K_NEAREST, ROAD_DETOUR, generate_candidates, haversine, to_route
+
+# Per-worker state: the model, graphs and stop arrays stay warm between tasks
+_STATE = {}
+
+
+def init_worker(metro_stations, bus_stops, metro_geojson_path=None, warmup=None):
+    router = SmartRouter()
+    geometry = MetroGeometry.from_geojson(metro_geojson_path) if metro_geojson_path else None
+    _STATE.update({
+        "router": router,
+        "network": TransitNetwork(metro_stations, bus_stops, geometry, router.graph, router.locations),
+        "metro": (metro_stations, np.array([[s["lat"], s["lon"]] for s in metro_stations]).reshape(-1, 2)),
+        "bus": (bus_stops, np.array([[s["lat"], s["lon"]] for s in bus_stops]).reshape(-1, 2)),
+    })
+    if warmup:
+        warm_worker(warmup)
+
+
+def warm_worker(warmup):
+    """Fill this worker's metro trip memo from a search_log.py warm-up list"""
+    network = _STATE["network"]
+    for pair in warmup.get("metro_pairs", []):
+        network.metro_trip({"lat": pair["from"][0], "lon": pair["from"][1]}, {"lat": pair["to"][0], "lon": pair["to"][1]})
+    # Searching from the hot OD cell centres prices the nearby stations' trips too
+    for cell in warmup.get("od_cells", []):
+        candidates_task(cell["start"], cell["dest"], haversine(cell["start"], cell["dest"]) * ROAD_DETOUR, "")
+
+
+def _ping():
+    return os.getpid()
+
+
+def k_nearest(coords, kind, k=K_NEAREST):
+    """Vectorised k nearest stops of a kind as [(stop, km), ...], closest first"""
+    stops, points = _STATE[kind]
+    if not stops:
+        return []
+    dists = _haversine_many(coords[0], coords[1], points[:, 0], points[:, 1])
+    k = min(k, len(stops))
+    nearest = np.argpartition(dists, k - 1)[:k]
+    nearest = nearest[np.argsort(dists[nearest])]
+    return [(stops[i], float(dists[i])) for i in nearest]
+
+
+def candidates_task(start_coords, dest_coords, road_km, destination):
+    """Pareto-optimal route options between two points, as route dicts"""
+    metro = (k_nearest(start_coords, "metro"), k_nearest(dest_coords, "metro"))
+    bus = (k_nearest(start_coords, "bus"), k_nearest(dest_coords, "bus"))
+    options, stats = generate_candidates(start_coords, dest_coords, road_km, metro, bus, network=_STATE["network"])
+    return [to_route(i + 1, legs, destination) for i, legs in enumerate(options)], stats
+
+
+def smart_route_task(start, end, traffic, density, edges):
+    return _STATE["router"].find_optimal_route(start, end, traffic, density, edges)
+
+
+def isochrone_task(lat, lon, minutes, modes):
+    return _STATE["network"].isochrone(lat, lon, minutes, modes)
+
+
+class PoolSaturated(Exception):
+    """Raised when too many computations are already queued"""
+
+
+class WorkerCrashed(Exception):
+    """Raised when a worker died mid-task; the pool has been rebuilt"""
+
+
+class ComputePool:
+    """
+    Runs CPU-heavy routing work off the event loop.
+
+    kind="process" uses a spawn-based process pool whose workers are warmed
+    with init_worker; kind="thread" shares one warm state in this process.
+    At most max_pending tasks may be queued or running in a worker (tasks
+    whose caller timed out still count until the worker finishes them);
+    beyond that run() fails fast with PoolSaturated so I/O-bound requests
+    keep flowing. If a worker process dies the pool is rebuilt.
+    """
+
+    def __init__(self, initargs, kind="process", max_workers=None, max_pending=None, timeout=10.0):
+        self.initargs = initargs
+        self.kind = kind
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.max_pending = max_pending or self.max_workers * 4
+        self.timeout = timeout
+        self.executor = None
+        self._outstanding = set()
+        self._respawn = None
+
+    @classmethod
+    def from_env(cls, initargs):
+        return cls(
+            initargs,
+            kind=os.environ.get("COMPUTE_POOL", "process"),
+            max_workers=int(os.environ.get("COMPUTE_WORKERS", 0)) or None,
+            max_pending=int(os.environ.get("COMPUTE_MAX_PENDING", 0)) or None,
+            timeout=float(os.environ.get("COMPUTE_TIMEOUT", 10.0)),
+        )
+
+    @property
+    def pending(self):
+        return len(self._outstanding)
+
+    def start(self):
+        if self.executor is not None:
+            return
+        if self.kind == "thread":
+            init_worker(*self.initargs)
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="compute")
+        else:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_worker,
+                initargs=self.initargs,
+            )
+
+    async def warm_up(self):
+        """Spawn every worker now so the first requests don't pay for it"""
+        self.start()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.executor, _ping) for _ in range(self.max_workers)))
+
+    async def run(self, fn, *args, timeout=None):
+        """
+        Run fn(*args) in the pool. Raises PoolSaturated when the queue is
+        full and asyncio.TimeoutError past the deadline. If the caller is
+        cancelled (e.g. client disconnect) a task that hasn't started yet
+        is dropped; one already running in a worker runs to completion.
+        Raises WorkerCrashed if a worker died, after replacing the pool.
+        """
+        if self.pending >= self.max_pending:
+            raise PoolSaturated(f"{self.pending} computations already pending")
+        self.start()
+        executor = self.executor
+        try:
+            future = executor.submit(fn, *args)
+            self._outstanding.add(future)
+            future.add_done_callback(self._outstanding.discard)
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout or self.timeout)
+        except BrokenExecutor as e:
+            # A dead worker (OOM kill, native crash) breaks a ProcessPoolExecutor
+            # for good; requests in flight fail but later ones get a new pool
+            if self.executor is executor:
+                print(f"Compute pool broken ({e}); restarting workers.")
+                self.shutdown()
+                self._respawn = asyncio.get_running_loop().create_task(self.warm_up())
+                self._respawn.add_done_callback(self._respawned)
+            raise WorkerCrashed(str(e)) from e
+
+    @staticmethod
+    def _respawned(task):
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Compute pool restart failed: {task.exception()!r}")
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
@@ -0,0 +1,263 @@
+import bisect
+import csv
+import json
+import math
+import re
+import unicodedata
+from collections import defaultdict
+from functools import lru_cache
+
+# Abbreviations seen in BMTC / OSM names
+SYNONYMS = {
+    "rd": "road", "st": "street", "stn": "station", "ngr": "nagar", "blr": "bangalore",
+    "bengaluru": "bangalore", "opp": "opposite", "jn": "junction", "jct": "junction",
+    "cir": "circle", "ext": "extension", "lyt": "layout", "mg": "mahatma gandhi",
+}
+# Type label -> ranking bonus when names tie (also the labels app.js shows)
+TYPE_PRIORITY = {"Location": 0.06, "Metro Station": 0.04, "Place": 0.03, "Bus Stop": 0.0}
+MIN_FUZZY = 0.5      # trigram similarity needed for a misspelt token to count
+PREFIX_STRENGTH = 0.9
+MATCH_THRESHOLD = 0.7  # confidence needed before geocode() skips Nominatim
+MIN_NAME_COVERAGE = 0.5  # share of a name's words (by IDF) a confident match must cover
+GEOCODE_CANDIDATES = 5
+
+
+def normalize(text):
+    """Lowercase, strip accents and punctuation, expand abbreviations"""
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii").lower()
+    tokens = []
+    for token in re.findall(r"[a-z0-9]+", text):
+        tokens.extend(SYNONYMS.get(token, token).split())
+    return tokens
+
+
+def _index_tokens(tokens):
+    # "Indira Nagar" should also match "indiranagar"
+    return set(tokens) | {a + b for a, b in zip(tokens, tokens[1:])}
+
+
+def _trigrams(token):
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class Geocoder:
+    """
+    In-process geocoder over a local gazetteer. Names are tokenised into an
+    inverted index (token -> entry ids); query tokens match exactly, by
+    prefix (for the token still being typed) or fuzzily through a trigram
+    index over the vocabulary, and entries are ranked by IDF-weighted
+    coverage of the query.
+
+    Ranking is tuned for autocomplete. geocode() instead uses a stricter
+    confidence: every query token must match exactly or fuzzily (a prefix
+    isn't enough), the matched words must cover at least MIN_NAME_COVERAGE
+    of the entry's name by IDF weight, and there is no type bonus.
+    """
+
+    def __init__(self):
+        self.entries = []
+        self._seen = set()
+
+    def add(self, name, lat, lon, kind):
+        name = " ".join(name.split())
+        key = (name.lower(), kind, round(lat, 3), round(lon, 3))
+        if not name or key in self._seen:
+            return
+        self._seen.add(key)
+        self.entries.append({"name": name, "type": kind, "lat": lat, "lon": lon})
+
+    def build(self):
+        """(Re)build the token and trigram indexes; call after adding entries"""
+        postings = defaultdict(list)
+        self._entry_tokens = []
+        for i, entry in enumerate(self.entries):
+            tokens = normalize(entry["name"])
+            self._entry_tokens.append(len(tokens) or 1)
+            for token in _index_tokens(tokens):
+                postings[token].append(i)
+
+        n = len(self.entries) or 1
+        self.postings = dict(postings)
+        self.idf = {t: math.log(1 + n / len(ids)) for t, ids in postings.items()}
+        self.vocab = sorted(postings)
+        self.trigrams = defaultdict(list)
+        self._gram_counts = {}
+        for token in self.vocab:
+            grams = _trigrams(token)
+            self._gram_counts[token] = len(grams)
+            for gram in grams:
+                self.trigrams[gram].append(token)
+        self._search.cache_clear()
+        return self
+
+    def _expand(self, token, is_last):
+        """Vocabulary tokens matching a query token, with match strength"""
+        matches = {}
+        if token in self.postings:
+            matches[token] = 1.0
+        if is_last and len(token) >= 2:
+            i = bisect.bisect_left(self.vocab, token)
+            while i < len(self.vocab) and self.vocab[i].startswith(token) and len(matches) < 50:
+                matches.setdefault(self.vocab[i], PREFIX_STRENGTH)
+                i += 1
+        if not matches and len(token) >= 4:
+            grams = _trigrams(token)
+            counts = defaultdict(int)
+            for gram in grams:
+                for candidate in self.trigrams.get(gram, ()):
+                    counts[candidate] += 1
+            # Dice coefficient can only reach MIN_FUZZY with enough shared grams
+            needed = MIN_FUZZY * len(grams) / 2
+            for candidate, shared in counts.items():
+                if shared < needed:
+                    continue
+                similarity = 2 * shared / (len(grams) + self._gram_counts[candidate])
+                if similarity >= MIN_FUZZY:
+                    matches[candidate] = similarity * 0.85
+        return matches
+
+    def _merge_split_words(self, tokens):
+        # "indira nagar" -> "indiranagar"; names index both forms, queries may use either
+        merged = []
+        for token in tokens:
+            if merged and merged[-1] + token in self.postings:
+                merged[-1] += token
+            else:
+                merged.append(token)
+        return merged
+
+    @lru_cache(maxsize=4096)
+    def _search(self, normalized, limit):
+        query_length = len(normalized.split())
+        tokens = self._merge_split_words(normalized.split())
+        if not tokens:
+            return ()
+
+        scores = defaultdict(float)
+        # Same, counting only exact and fuzzy matches, for geocode confidence
+        solid_scores = defaultdict(float)
+        solid_hits = defaultdict(int)
+        matched = defaultdict(set)
+        total_weight = 0.0
+        for pos, token in enumerate(tokens):
+            expansions = self._expand(token, pos == len(tokens) - 1)
+            weight = max((self.idf[t] for t in expansions), default=math.log(1 + len(self.entries)))
+            total_weight += weight
+            best, solid = {}, {}
+            for candidate, strength in expansions.items():
+                is_solid = strength != PREFIX_STRENGTH or candidate == token
+                for i in self.postings[candidate]:
+                    if strength > best.get(i, 0.0):
+                        best[i] = strength
+                    if is_solid:
+                        matched[i].add(candidate)
+                        if strength > solid.get(i, 0.0):
+                            solid[i] = strength
+            for i, strength in best.items():
+                scores[i] += strength * weight
+            for i, strength in solid.items():
+                solid_scores[i] += strength * weight
+                solid_hits[i] += 1
+
+        ranked = []
+        for i, score in scores.items():
+            entry = self.entries[i]
+            coverage = score / total_weight
+            # Prefer names without many unmatched extra words
+            extra = max(self._entry_tokens[i] - query_length, 0)
+            final = coverage - 0.03 * extra + TYPE_PRIORITY.get(entry["type"], 0.0)
+            exact = " ".join(normalize(entry["name"])) == normalized
+            if exact:
+                final += 0.2
+            ranked.append((final, exact, i))
+        ranked.sort(key=lambda item: -item[0])
+
+        results, names = [], set()
+        for final, exact, i in ranked:
+            entry = self.entries[i]
+            if (entry["name"].lower(), entry["type"]) in names:
+                continue
+            names.add((entry["name"].lower(), entry["type"]))
+            if exact:
+                confidence = 1.0
+            elif solid_hits[i] < len(tokens) or self._name_coverage(i, matched[i]) < MIN_NAME_COVERAGE:
+                confidence = 0.0
+            else:
+                confidence = solid_scores[i] / total_weight
+            results.append({**entry, "score": round(min(final, 1.0), 3), "confidence": round(confidence, 3)})
+            if len(results) >= limit:
+                break
+        return tuple(results)
+
+    def _name_coverage(self, i, matched):
+        """IDF-weighted share of entry i's name words covered by matched tokens"""
+        tokens = normalize(self.entries[i]["name"])
+        covered = [t in matched for t in tokens]
+        for j in range(len(tokens) - 1):
+            if tokens[j] + tokens[j + 1] in matched:
+                covered[j] = covered[j + 1] = True
+        total = sum(self.idf[t] for t in tokens)
+        return sum(self.idf[t] for t, c in zip(tokens, covered) if c) / total if total else 0.0
+
+    def search(self, query, limit=8):
+        return list(self._search(" ".join(normalize(query)), limit))
+
+    def geocode(self, query):
+        """[lat, lon] of the best confident match, or None"""
+        for result in self._search(" ".join(normalize(query)), GEOCODE_CANDIDATES):
+            if result["confidence"] >= MATCH_THRESHOLD:
+                return [result["lat"], result["lon"]]
+        return None
+
+    def load_places(self, path):
+        """
+        Import an OSM place extract: GeoJSON points with a "name" property,
+        or a CSV with name, lat, lon columns.
+        """
+        count = len(self.entries)
+        try:
+            if path.endswith(".csv"):
+                with open(path, "r", encoding="utf-8") as f:
+                    for row in csv.DictReader(f):
+                        try:
+                            self.add(row["name"], float(row["lat"]), float(row["lon"]), "Place")
+                        except (KeyError, ValueError):
+                            continue
+            else:
+                with open(path, "r", encoding="utf-8") as f:
+                    for feature in json.load(f).get("features", []):
+                        props = feature.get("properties") or {}
+                        geometry = feature.get("geometry") or {}
+                        name = props.get("name") or props.get("Name")
+                        if name and geometry.get("type") == "Point":
+                            lon, lat = geometry["coordinates"][:2]
+                            self.add(name, lat, lon, "Place")
+            print(f"Imported {len(self.entries) - count} places from {path}.")
+        except Exception as e:
+            print(f"Error importing places from {path}: {e}")
+
+    def load_route_endpoints(self, path):
+        """
+        BMTC route origins/destinations carry no coordinates; add each as an
+        alias of the bus stop or place it confidently matches.
+        """
+        try:
+            endpoints = set()
+            with open(path, "r", encoding="utf-8-sig") as f:
+                for row in csv.DictReader(f):
+                    endpoints.add(row["Starting From"].strip())
+                    endpoints.add(row["Destination"].strip())
+        except Exception as e:
+            print(f"Error loading route endpoints: {e}")
+            return
+
+        self.build()
+        aliases = []
+        for name in endpoints:
+            for result in self._search(" ".join(normalize(name)), GEOCODE_CANDIDATES):
+                if result["confidence"] >= MATCH_THRESHOLD:
+                    aliases.append((name.title(), result["lat"], result["lon"], result["type"]))
+                    break
+        for name, lat, lon, kind in aliases:
+            self.add(name, lat, lon, kind)
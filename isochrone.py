@@ -0,0 +1,285 @@
+import heapq
+import math
+import threading
+from collections import OrderedDict
+import numpy as np
+
+WALK_KMPH = 4.5
+WALK_DETOUR = 1.2          # street distance vs straight line
+MAX_WALK_LINK_KM = 0.8     # walking transfers between stops
+METRO_KMPH = 34.0
+METRO_DWELL_MIN = 0.5      # per station stop
+METRO_WAIT_MIN = 5.0       # average wait when boarding from the street
+METRO_TRANSFER_MIN = 4.0   # changing lines: platform walk plus wait
+MAX_INTERCHANGE_KM = 0.3   # separate station points close enough to change at
+ROAD_KMPH = 20.0           # SmartRouter graph edges (cab/auto)
+
+CELL_DEG = 0.005           # ~550 m origin cells for result caching
+CACHE_SIZE = 1024
+EARTH_RADIUS_KM = 6371.0
+
+
+def _haversine_many(lat, lon, lats, lons):
+    """Distance in km from one point to arrays of points"""
+    lat1, lon1 = math.radians(lat), math.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def _walk_minutes(km):
+    return km * WALK_DETOUR / WALK_KMPH * 60
+
+
+def _drop_covered(lats, lons, radii):
+    """Indices of circles not entirely inside another circle"""
+    km_lat = (lats[:, None] - lats[None, :]) * 111.0
+    km_lon = (lons[:, None] - lons[None, :]) * 111.0 * np.cos(np.radians(lats))[:, None]
+    gap = np.hypot(km_lat, km_lon)
+    # inside[i, j]: circle i lies within circle j
+    inside = gap + radii[:, None] <= radii[None, :] + 1e-9
+    np.fill_diagonal(inside, False)
+    # Identical circles contain each other; keep the first
+    inside &= ~np.triu(inside & inside.T, 1)
+    return np.nonzero(~inside.any(axis=1))[0]
+
+
+class TransitNetwork:
+    """
+    Metro stations, bus stops and SmartRouter localities as one graph stored
+    in CSR form (indptr / indices / minutes arrays), one array per mode, for
+    bounded one-to-all Dijkstra searches.
+    """
+
+    MODES = ("walk", "metro", "road")
+
+    def __init__(self, metro_stations, bus_stops, metro_geometry=None, road_graph=None, road_locations=None):
+        self.nodes = []
+        for s in metro_stations:
+            self.nodes.append({"name": s["name"], "type": "metro", "lat": s["lat"], "lon": s["lon"]})
+        for s in bus_stops:
+            self.nodes.append({"name": s["name"], "type": "bus", "lat": s["lat"], "lon": s["lon"]})
+        road_index = {}
+        for name, (lat, lon) in (road_locations or {}).items():
+            road_index[name] = len(self.nodes)
+            self.nodes.append({"name": name.title(), "type": "locality", "lat": lat, "lon": lon})
+
+        self.lats = np.array([n["lat"] for n in self.nodes], dtype=np.float64)
+        self.lons = np.array([n["lon"] for n in self.nodes], dtype=np.float64)
+        self.is_metro = np.array([n["type"] == "metro" for n in self.nodes], dtype=bool)
+
+        # Per-station metro links [(station, km, line)] for whole-trip pricing
+        self.metro_stations = metro_stations
+        self.metro_index = {(s["lat"], s["lon"]): i for i, s in enumerate(metro_stations)}
+        self.metro_links = [[] for _ in metro_stations]
+        self.metro_lines = []
+        self._metro_trips = {}
+
+        edges = {mode: ([], [], []) for mode in self.MODES}
+        self._add_walk_edges(edges["walk"])
+        if metro_geometry is not None:
+            self._add_metro_edges(edges["metro"], metro_geometry, metro_stations)
+        if road_graph is not None:
+            for u, v, data in road_graph.edges(data=True):
+                minutes = data["distance_km"] * 1.3 / ROAD_KMPH * 60
+                for a, b in ((u, v), (v, u)):
+                    if a in road_index and b in road_index:
+                        self._append(edges["road"], road_index[a], road_index[b], minutes)
+
+        self.csr = {mode: self._to_csr(*edges[mode]) for mode in self.MODES}
+        self._cache = OrderedDict()
+        # Thread-mode compute pools call isochrone() concurrently
+        self._cache_lock = threading.Lock()
+
+    @staticmethod
+    def _append(edge_lists, u, v, minutes):
+        edge_lists[0].append(u)
+        edge_lists[1].append(v)
+        edge_lists[2].append(minutes)
+
+    def _add_walk_edges(self, edge_lists):
+        for i in range(len(self.nodes)):
+            dists = _haversine_many(self.lats[i], self.lons[i], self.lats, self.lons)
+            near = np.nonzero(dists <= MAX_WALK_LINK_KM)[0]
+            for j in near:
+                if j != i:
+                    minutes = _walk_minutes(dists[j])
+                    # Boarding the metro from the street costs an average wait
+                    if self.is_metro[j] and not self.is_metro[i]:
+                        minutes += METRO_WAIT_MIN
+                    self._append(edge_lists, i, int(j), minutes)
+
+    def _add_metro_edges(self, edge_lists, metro_geometry, metro_stations):
+        # Metro stations occupy the first len(metro_stations) node ids
+        self.metro_lines = [line["name"] for line in metro_geometry.lines]
+        for line, sequence in enumerate(metro_geometry.station_sequences(metro_stations)):
+            for (a, along_a), (b, along_b) in zip(sequence, sequence[1:]):
+                minutes = (along_b - along_a) / METRO_KMPH * 60 + METRO_DWELL_MIN
+                self._append(edge_lists, a, b, minutes)
+                self._append(edge_lists, b, a, minutes)
+                self.metro_links[a].append((b, along_b - along_a, line))
+                self.metro_links[b].append((a, along_b - along_a, line))
+        for a in range(len(metro_stations)):
+            dists = _haversine_many(self.lats[a], self.lons[a], self.lats[:len(metro_stations)], self.lons[:len(metro_stations)])
+            for b in np.nonzero(dists <= MAX_INTERCHANGE_KM)[0]:
+                if b != a:
+                    self.metro_links[a].append((int(b), float(dists[b]), None))
+
+    def _to_csr(self, src, dst, minutes):
+        n = len(self.nodes)
+        src = np.asarray(src, dtype=np.int64)
+        order = np.argsort(src, kind="stable")
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+        # Plain lists are faster than NumPy scalars inside the Dijkstra loop
+        return (
+            indptr.tolist(),
+            np.asarray(dst, dtype=np.int64)[order].tolist(),
+            np.asarray(minutes, dtype=np.float64)[order].tolist(),
+        )
+
+    def reachable(self, lat, lon, max_minutes, modes=("walk", "metro")):
+        """
+        Bounded Dijkstra from (lat, lon). Returns an array of minutes to each
+        node (inf where unreachable within max_minutes).
+        """
+        n = len(self.nodes)
+        best = [math.inf] * n
+        heap = []
+
+        # Access legs: walk from the origin to anything within the budget
+        max_access_km = max_minutes / 60 * WALK_KMPH / WALK_DETOUR
+        dists = _haversine_many(lat, lon, self.lats, self.lons)
+        for j in np.nonzero(dists <= max_access_km)[0]:
+            minutes = _walk_minutes(dists[j]) + (METRO_WAIT_MIN if self.is_metro[j] else 0.0)
+            if minutes <= max_minutes and minutes < best[j]:
+                best[j] = minutes
+                heap.append((minutes, int(j)))
+        heapq.heapify(heap)
+
+        graphs = [self.csr[m] for m in modes if m in self.csr]
+        while heap:
+            t, u = heapq.heappop(heap)
+            if t > best[u]:
+                continue
+            for indptr, indices, weights in graphs:
+                for k in range(indptr[u], indptr[u + 1]):
+                    nt = t + weights[k]
+                    v = indices[k]
+                    if nt <= max_minutes and nt < best[v]:
+                        best[v] = nt
+                        heapq.heappush(heap, (nt, v))
+        return np.asarray(best)
+
+    def metro_trip(self, from_station, to_station):
+        """
+        Quickest metro ride between two station dicts, charging
+        METRO_TRANSFER_MIN per change of line (walking between nearby
+        station points counts as a change). Returns {"minutes", "km",
+        "runs": [{"line", "from", "to", "km"}, ...]} with one run per line
+        ridden, or None when the stations aren't connected. Memoised.
+        """
+        a = self.metro_index.get((from_station["lat"], from_station["lon"]))
+        b = self.metro_index.get((to_station["lat"], to_station["lon"]))
+        if a is None or b is None or a == b:
+            return None
+        key = (a, b)
+        if key in self._metro_trips:
+            return self._metro_trips[key]
+
+        # States are (station, line ridden into it); None = not on a train
+        start = (a, None)
+        best = {start: 0.0}
+        prev = {}
+        heap = [(0.0, a, -1)]
+        end = None
+        while heap:
+            t, u, line_id = heapq.heappop(heap)
+            state = (u, None if line_id < 0 else line_id)
+            if t > best.get(state, math.inf):
+                continue
+            if u == b:
+                end = state
+                break
+            for v, km, line in self.metro_links[u]:
+                if line is None:
+                    if state[1] is None:
+                        continue
+                    nt = t + _walk_minutes(km) + METRO_TRANSFER_MIN
+                else:
+                    nt = t + km / METRO_KMPH * 60 + METRO_DWELL_MIN
+                    if state[1] is not None and line != state[1]:
+                        nt += METRO_TRANSFER_MIN
+                nxt = (v, line)
+                if nt < best.get(nxt, math.inf):
+                    best[nxt] = nt
+                    prev[nxt] = (state, km)
+                    heapq.heappush(heap, (nt, v, -1 if line is None else line))
+
+        trip = None
+        if end is not None:
+            steps = []
+            state = end
+            while state != start:
+                before, km = prev[state]
+                steps.append((before[0], state[0], km, state[1]))
+                state = before
+            runs = []
+            for u, v, km, line in reversed(steps):
+                if line is None:
+                    continue
+                if runs and runs[-1]["line_id"] == line and runs[-1]["to"] is self.metro_stations[u]:
+                    runs[-1]["to"] = self.metro_stations[v]
+                    runs[-1]["km"] += km
+                else:
+                    runs.append({"line_id": line, "from": self.metro_stations[u], "to": self.metro_stations[v], "km": km})
+            for run in runs:
+                run["line"] = self.metro_lines[run.pop("line_id")]
+            trip = {"minutes": best[end], "km": sum(r["km"] for r in runs), "runs": runs}
+        self._metro_trips[key] = trip
+        return trip
+
+    def isochrone(self, lat, lon, max_minutes=30, modes=("walk", "metro")):
+        """
+        Reachable stops and the reachable area for a trip budget. The area is
+        the union of "areas" circles: each reached node (and the origin)
+        buffered by the walk its leftover time allows, dropping circles that
+        lie inside another. Origins are snapped to a CELL_DEG grid and
+        results are cached per cell.
+        """
+        cell = (round(lat / CELL_DEG) * CELL_DEG, round(lon / CELL_DEG) * CELL_DEG)
+        modes = tuple(sorted(set(modes)))
+        key = (round(cell[0], 6), round(cell[1], 6), int(max_minutes), modes)
+        with self._cache_lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        best = self.reachable(key[0], key[1], max_minutes, modes)
+        reached = np.nonzero(np.isfinite(best))[0]
+
+        stops = [{**self.nodes[i], "minutes": round(float(best[i]), 1)} for i in reached]
+        stops.sort(key=lambda s: s["minutes"])
+
+        # Buffer each reached node by the walk possible with its leftover time
+        lats = np.concatenate([[key[0]], self.lats[reached]])
+        lons = np.concatenate([[key[1]], self.lons[reached]])
+        radii = (max_minutes - np.concatenate([[0.0], best[reached]])) / 60 * WALK_KMPH / WALK_DETOUR
+        keep = _drop_covered(lats, lons, radii)
+
+        result = {
+            "origin_cell": [key[0], key[1]],
+            "minutes": int(max_minutes),
+            "modes": list(modes),
+            "stops": stops,
+            "areas": [
+                {"center": [round(float(lats[i]), 5), round(float(lons[i]), 5)], "radius_km": round(float(radii[i]), 3)}
+                for i in keep if radii[i] > 0
+            ],
+        }
+
+        with self._cache_lock:
+            self._cache[key] = result
+            if len(self._cache) > CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return result
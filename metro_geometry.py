@@ -0,0 +1,176 @@
+import json
+import numpy as np
+
+# Stations further than this from every line vertex get a straight segment
+MAX_SNAP_KM = 0.75
+# A station also joins other lines (an interchange) only this close to them
+LINE_SNAP_KM = 0.35
+# LineString ends closer than this are treated as the same junction
+JOIN_KM = 0.2
+# Rough km per degree at Bangalore's latitude, for snapping distances
+KM_PER_DEG_LAT = 111.0
+KM_PER_DEG_LON = 108.6
+
+
+def encode_polyline(coords, precision=5):
+    """Google encoded polyline for a list of [lat, lon] pairs"""
+    factor = 10 ** precision
+    output = []
+    prev_lat = prev_lon = 0
+    for lat, lon in coords:
+        ilat = int(round(lat * factor))
+        ilon = int(round(lon * factor))
+        for delta in (ilat - prev_lat, ilon - prev_lon):
+            value = ~(delta << 1) if delta < 0 else delta << 1
+            while value >= 0x20:
+                output.append(chr((0x20 | (value & 0x1f)) + 63))
+                value >>= 5
+            output.append(chr(value + 63))
+        prev_lat, prev_lon = ilat, ilon
+    return "".join(output)
+
+
+def _gap_km(a, b):
+    return float(np.hypot((a[0] - b[0]) * KM_PER_DEG_LAT, (a[1] - b[1]) * KM_PER_DEG_LON))
+
+
+def join_lines(lines):
+    """
+    The GeoJSON splits most lines into several LineStrings (one per phase).
+    Chain the pieces of each colour end to end into a single path so any two
+    stations on a line share one path. Pieces that don't touch stay separate.
+    """
+    by_color = {}
+    for line in lines:
+        by_color.setdefault(line["color"] or line["name"], []).append(line)
+
+    joined = []
+    for pieces in by_color.values():
+        while pieces:
+            first = pieces.pop(0)
+            path = list(first["path"])
+            merged = 0
+            k = 0
+            while k < len(pieces):
+                p = pieces[k]["path"]
+                if _gap_km(path[-1], p[0]) <= JOIN_KM:
+                    path = path + p[1:]
+                elif _gap_km(path[-1], p[-1]) <= JOIN_KM:
+                    path = path + p[::-1][1:]
+                elif _gap_km(path[0], p[-1]) <= JOIN_KM:
+                    path = p[:-1] + path
+                elif _gap_km(path[0], p[0]) <= JOIN_KM:
+                    path = p[::-1][:-1] + path
+                else:
+                    k += 1
+                    continue
+                # A new end may now touch a piece we already skipped
+                pieces.pop(k)
+                merged += 1
+                k = 0
+            # "Line-1 (Purple): Mysore Road - Baiyappanahalli" -> "Line-1 (Purple)"
+            name = first["name"].split(":")[0].strip() if merged else first["name"]
+            joined.append({"name": name, "color": first["color"], "path": path})
+    return joined
+
+
+class MetroGeometry:
+    """
+    Metro LineStrings from the GeoJSON with each station pre-snapped to its
+    nearest vertex on every line, so a station-to-station segment becomes a
+    slice instead of a scan over every coordinate.
+    """
+
+    def __init__(self, lines, stations):
+        # lines: [{"name", "color", "path": [[lat, lon], ...]}]
+        self.lines = lines
+        self._paths = [np.asarray(line["path"], dtype=np.float64) for line in lines]
+        self._snaps = {}
+        self._segments = {}
+        for station in stations:
+            self._snap((station["lat"], station["lon"]))
+
+    @classmethod
+    def from_geojson(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        lines, stations = [], []
+        for feature in data["features"]:
+            geometry = feature["geometry"]
+            props = feature["properties"]
+            if geometry["type"] == "LineString":
+                lines.append({
+                    "name": props.get("Name", "").strip(),
+                    "color": (props.get("description") or "").strip().lower(),
+                    # GeoJSON is lon,lat; everything else here is lat,lon
+                    "path": [[c[1], c[0]] for c in geometry["coordinates"]]
+                })
+            elif geometry["type"] == "Point":
+                coords = geometry["coordinates"]
+                stations.append({"lat": coords[1], "lon": coords[0]})
+        return cls(join_lines(lines), stations)
+
+    def _snap(self, coord):
+        """(distance_km, vertex_index) of coord's nearest vertex on each line"""
+        key = (round(coord[0], 6), round(coord[1], 6))
+        snap = self._snaps.get(key)
+        if snap is None:
+            snap = []
+            for path in self._paths:
+                d2 = ((path[:, 0] - key[0]) * KM_PER_DEG_LAT) ** 2 + ((path[:, 1] - key[1]) * KM_PER_DEG_LON) ** 2
+                idx = int(np.argmin(d2))
+                snap.append((float(np.sqrt(d2[idx])), idx))
+            self._snaps[key] = snap
+        return snap
+
+    def station_sequences(self, stations):
+        """
+        For each line, the stations lying on it ordered along the track as
+        [(station_index, along_km), ...]. Used to build metro adjacency.
+        Each station sits on its nearest line (within MAX_SNAP_KM) and on
+        other lines only within LINE_SNAP_KM, so a station near a line it
+        isn't on doesn't create a false link.
+        """
+        snaps = [self._snap((station["lat"], station["lon"])) for station in stations]
+        nearest = [min(range(len(snap)), key=lambda i: snap[i][0]) if snap else None for snap in snaps]
+        sequences = []
+        for i, path in enumerate(self._paths):
+            steps = np.hypot(np.diff(path[:, 0]) * KM_PER_DEG_LAT, np.diff(path[:, 1]) * KM_PER_DEG_LON)
+            along = np.concatenate([[0.0], np.cumsum(steps)])
+            on_line = []
+            for j, snap in enumerate(snaps):
+                dist, idx = snap[i]
+                if dist <= (MAX_SNAP_KM if nearest[j] == i else LINE_SNAP_KM):
+                    on_line.append((j, float(along[idx])))
+            on_line.sort(key=lambda item: item[1])
+            sequences.append(on_line)
+        return sequences
+
+    def segment(self, from_coords, to_coords):
+        """
+        Geometry between two stations along the line both sit closest to.
+        Returns {"line", "line_color", "geometry" (encoded polyline)} or None
+        when no single line passes near both points. Memoised per pair.
+        """
+        key = (round(from_coords[0], 6), round(from_coords[1], 6), round(to_coords[0], 6), round(to_coords[1], 6))
+        if key in self._segments:
+            return self._segments[key]
+
+        a, b = self._snap(from_coords), self._snap(to_coords)
+        result = None
+        if self.lines:
+            best = min(range(len(self.lines)), key=lambda i: max(a[i][0], b[i][0]))
+            if max(a[best][0], b[best][0]) <= MAX_SNAP_KM:
+                i1, i2 = a[best][1], b[best][1]
+                path = self.lines[best]["path"][min(i1, i2):max(i1, i2) + 1]
+                if i1 > i2:
+                    path = path[::-1]
+                result = {
+                    "line": self.lines[best]["name"],
+                    "line_color": self.lines[best]["color"],
+                    "geometry": encode_polyline([from_coords] + path + [to_coords])
+                }
+
+        self._segments[key] = result
+        return result
@@ -0,0 +1,25 @@
+import os
+import re
+
+# Versioned traffic model artifacts written by traffic_train_model.py. Kept
+# separate so the runtime router can find models without importing XGBoost's
+# training helpers.
+MODEL_DIR = os.environ.get("TRAFFIC_MODEL_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "models"))
+MODEL_PATTERN = re.compile(r"^traffic_xgb_v(\d+)\.json$")
+
+
+def next_model_version(model_dir=MODEL_DIR):
+    if not os.path.isdir(model_dir):
+        return 1
+    versions = [int(m.group(1)) for m in map(MODEL_PATTERN.match, os.listdir(model_dir)) if m]
+    return max(versions, default=0) + 1
+
+
+def latest_model_path(model_dir=MODEL_DIR):
+    """Newest versioned artifact in model_dir, or None"""
+    if not os.path.isdir(model_dir):
+        return None
+    found = [(int(m.group(1)), m.group(0)) for m in map(MODEL_PATTERN.match, os.listdir(model_dir)) if m]
+    if not found:
+        return None
+    return os.path.join(model_dir, max(found)[1])
@@ -0,0 +1,214 @@
+import asyncio
+import math
+import os
+import numpy as np
+
+# Route feature vector; each is scaled so a weight of 1 means "this much hurts as much as"
+FEATURES = ["duration", "cost", "risk", "transfers", "walk_km"]
+FEATURE_SCALE = np.array([60.0, 200.0, 1.0, 2.0, 1.0], dtype=np.float32)
+
+SAFETY_RISK = {"high": 0.0, "medium": 0.5, "low": 1.0}
+
+PRIORITY_WEIGHTS = {
+    "balanced": [1.0, 1.0, 0.6, 0.4, 0.4],
+    "speed": [2.0, 0.4, 0.4, 0.6, 0.3],
+    "cost": [0.5, 2.0, 0.4, 0.2, 0.3],
+}
+MODE_PREFERENCES = ["any", "metro", "bus"]
+MODE_BONUS = 0.5           # score credit for routes using the preferred mode
+EXCESS_WALK_PENALTY = 2.0  # per km walked beyond the user's max_walk
+LEARNING_RATE = 0.05
+SAVE_INTERVAL = 30.0       # seconds between background saves of changed weights
+
+PREFERENCES_PATH = os.environ.get(
+    "PREFERENCES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "user_preferences.npz")
+)
+
+
+def _walk_km(segment):
+    (lat1, lon1), (lat2, lon2) = segment["from"], segment["to"]
+    # Equirectangular is plenty at walking distances; * 1.3 for street detour
+    x = math.radians(lon2 - lon1) * math.cos(math.radians((lat1 + lat2) / 2))
+    y = math.radians(lat2 - lat1)
+    return 6371 * math.hypot(x, y) * 1.3
+
+
+def route_features(routes):
+    """(n_routes, len(FEATURES)) matrix of raw, unscaled features"""
+    features = np.zeros((len(routes), len(FEATURES)), dtype=np.float32)
+    for i, route in enumerate(routes):
+        segments = route.get("segments", [])
+        rides = sum(1 for s in segments if s["mode"] != "walk")
+        features[i] = (
+            route["duration"],
+            route["cost"],
+            SAFETY_RISK.get(str(route.get("safety", "")).lower(), 0.5),
+            max(0, rides - 1),
+            sum(_walk_km(s) for s in segments if s["mode"] == "walk"),
+        )
+    return features
+
+
+class PreferenceRanker:
+    """
+    Per-user route weights held in one float32 matrix (a row per user),
+    plus a mode preference and walking limit per user. Routes are scored
+    with a single matrix-vector product and weights are learned online
+    from the option the user actually picks, using the features of the
+    routes last ranked for that user. Only users created through
+    set_preferences() are learned for, and changes are written to disk in
+    the background rather than on every request.
+    """
+
+    def __init__(self, path=PREFERENCES_PATH, capacity=1024, save_interval=SAVE_INTERVAL):
+        self.path = path
+        self.save_interval = save_interval
+        self.dirty = False
+        self._task = None
+        self.index = {}
+        self.weights = np.zeros((capacity, len(FEATURES)), dtype=np.float32)
+        self.mode = np.zeros(capacity, dtype=np.int8)
+        self.max_walk = np.full(capacity, np.inf, dtype=np.float32)
+        self.last_ranked = {}
+        if path and os.path.exists(path):
+            self.load()
+
+    def _row(self, user_id):
+        row = self.index.get(user_id)
+        if row is None:
+            row = len(self.index)
+            if row >= len(self.weights):
+                grow = len(self.weights)
+                self.weights = np.vstack([self.weights, np.zeros_like(self.weights)])
+                self.mode = np.concatenate([self.mode, np.zeros(grow, dtype=np.int8)])
+                self.max_walk = np.concatenate([self.max_walk, np.full(grow, np.inf, dtype=np.float32)])
+            self.index[user_id] = row
+            self.weights[row] = PRIORITY_WEIGHTS["balanced"]
+        return row
+
+    def set_preferences(self, user_id, priority="balanced", mode="any", max_walk=None):
+        """
+        Reset a user's weights to the prior for their stated priority.
+        Raises ValueError if max_walk is not a non-negative number.
+        """
+        limit = float(max_walk) if max_walk not in (None, "") else np.inf
+        if math.isnan(limit) or limit < 0:
+            raise ValueError(f"Invalid max_walk: {max_walk!r}")
+        row = self._row(user_id)
+        self.weights[row] = PRIORITY_WEIGHTS.get(priority, PRIORITY_WEIGHTS["balanced"])
+        self.mode[row] = MODE_PREFERENCES.index(mode) if mode in MODE_PREFERENCES else 0
+        self.max_walk[row] = limit or np.inf
+        self.dirty = True
+
+    def _profile(self, user_id, priority, mode, max_walk):
+        """Stored profile for known users, else one built from the request"""
+        row = self.index.get(user_id) if user_id else None
+        if row is not None:
+            return self.weights[row], MODE_PREFERENCES[self.mode[row]], self.max_walk[row]
+        weights = np.asarray(PRIORITY_WEIGHTS.get(priority, PRIORITY_WEIGHTS["balanced"]), dtype=np.float32)
+        return weights, mode or "any", float(max_walk) if max_walk else np.inf
+
+    def rank(self, routes, user_id=None, priority=None, mode=None, max_walk=None):
+        """
+        Set ai_score (0-10, best route = 10) and features on every route and
+        return them sorted best first.
+        """
+        if not routes:
+            return routes
+        weights, mode, max_walk = self._profile(user_id, priority, mode, max_walk)
+        raw = route_features(routes)
+        scaled = raw / FEATURE_SCALE
+
+        cost = scaled @ weights
+        cost += EXCESS_WALK_PENALTY * np.maximum(raw[:, 4] - max_walk, 0)
+        if mode != "any":
+            uses_mode = np.array([any(s["mode"] == mode for s in r.get("segments", [])) for r in routes])
+            cost -= MODE_BONUS * uses_mode
+
+        ai_scores = 10 * np.exp(-(cost - cost.min()))
+        for route, score, features in zip(routes, ai_scores, raw):
+            route["ai_score"] = round(float(score), 1)
+            route["features"] = [round(float(f), 2) for f in features]
+
+        order = np.argsort(cost, kind="stable")
+        if user_id in self.index:
+            self.last_ranked[user_id] = raw[order]
+        return [routes[i] for i in order]
+
+    def record_choice(self, user_id, chosen):
+        """
+        One SGD step on the multinomial-logit likelihood of the route at
+        index chosen among those last ranked for the user. Unknown users,
+        or users with nothing ranked, are ignored. Raises ValueError if the
+        step would leave non-finite weights.
+        """
+        row = self.index.get(user_id) if user_id else None
+        candidates = self.last_ranked.pop(user_id, None)
+        if row is None or candidates is None or not 0 <= chosen < len(candidates):
+            return False
+        scaled = candidates / FEATURE_SCALE
+        utility = -(scaled @ self.weights[row])
+        p = np.exp(utility - utility.max())
+        p /= p.sum()
+        # d(log p_chosen)/dw = E_p[z] - z_chosen
+        gradient = p @ scaled - scaled[chosen]
+        weights = np.maximum(self.weights[row] + LEARNING_RATE * gradient, 0.0)
+        if not np.isfinite(weights).all():
+            raise ValueError("Choice would make weights non-finite")
+        self.weights[row] = weights
+        self.dirty = True
+        return True
+
+    def _snapshot(self):
+        n = len(self.index)
+        users = np.array(sorted(self.index, key=self.index.get), dtype=str)
+        self.dirty = False
+        return {"users": users, "weights": self.weights[:n].copy(), "mode": self.mode[:n].copy(), "max_walk": self.max_walk[:n].copy()}
+
+    def _write(self, snapshot):
+        # Write then rename so a crash mid-save never leaves a truncated file
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, **snapshot)
+        os.replace(tmp, self.path)
+
+    def save(self):
+        if self.path:
+            self._write(self._snapshot())
+
+    async def flush(self):
+        """Save from a worker thread if anything changed since the last save"""
+        if self.path and self.dirty:
+            try:
+                await asyncio.to_thread(self._write, self._snapshot())
+            except Exception as e:
+                self.dirty = True
+                print(f"Error saving preferences: {e}")
+
+    async def _save_loop(self):
+        while True:
+            await asyncio.sleep(self.save_interval)
+            await self.flush()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._save_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    def load(self):
+        try:
+            data = np.load(self.path)
+            for user_id, weights, mode, max_walk in zip(data["users"], data["weights"], data["mode"], data["max_walk"]):
+                row = self._row(str(user_id))
+                self.weights[row] = weights
+                self.mode[row] = mode
+                self.max_walk[row] = max_walk
+            print(f"Loaded preferences for {len(self.index)} users.")
+        except Exception as e:
+            print(f"Error loading preferences: {e}")
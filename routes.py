@@ -1,12 +1,20 @@
+import asyncio
 import json
 import os
-import math
+import time
 import csv
 from fastapi import APIRouter, Query, HTTPException
 from fastapi.responses import FileResponse
 from typing import List, Optional
 import requests
-from smart_router import SmartRouter
+from traffic_feed import TrafficFeed
+from metro_geometry import MetroGeometry
+from isochrone import TransitNetwork
+from candidates import haversine
+from compute_pool import ComputePool, PoolSaturated, WorkerCrashed, candidates_task, smart_route_task, isochrone_task
+from ranking import PreferenceRanker
+from geocoder import Geocoder
+from search_log import SearchLog, load_warmup
 
 router = APIRouter()
 
@@ -20,13 +28,18 @@ LOCATIONS = {
     "hsr layout": [12.9121, 77.6446]
 }
 
+# Most route options returned by /search after ranking
+MAX_OPTIONS = 6
+
 # Global Data Containers
 METRO_STATIONS = []
 BUS_STOPS = []
+METRO_GEOMETRY = None
+GEOCODER = Geocoder()
 
 # Load Data on Startup
 def load_data():
-    global METRO_STATIONS, BUS_STOPS
+    global METRO_STATIONS, BUS_STOPS, METRO_GEOMETRY
     base_path = os.path.dirname(__file__)
     
     # 1. Load Metro Data (GeoJSON)
@@ -43,6 +56,10 @@ def load_data():
                         "lat": coords[1]
                     })
         print(f"Loaded {len(METRO_STATIONS)} metro stations.")
+
+        # Snap stations onto line geometry once so segments are just slices
+        METRO_GEOMETRY = MetroGeometry.from_geojson(metro_path)
+        print(f"Indexed {len(METRO_GEOMETRY.lines)} metro lines.")
     except Exception as e:
         print(f"Error loading metro data: {e}")
 
@@ -72,10 +89,48 @@ def load_data():
     except Exception as e:
         print(f"Error loading bus data: {e}")
 
+    # 3. Local Gazetteer for Geocoding
+    for name, (lat, lon) in LOCATIONS.items():
+        GEOCODER.add(name.title(), lat, lon, "Location")
+    for station in METRO_STATIONS:
+        GEOCODER.add(station["name"], station["lat"], station["lon"], "Metro Station")
+    for stop in BUS_STOPS:
+        GEOCODER.add(stop["name"], stop["lat"], stop["lon"], "Bus Stop")
+    # Optional OSM place extracts (GeoJSON or CSV), separated by os.pathsep
+    for path in filter(None, os.environ.get("GAZETTEER_PLACES", "").split(os.pathsep)):
+        GEOCODER.load_places(path)
+    GEOCODER.load_route_endpoints(os.path.join(base_path, "bus-route-num.csv.csv"))
+    GEOCODER.build()
+    print(f"Indexed {len(GEOCODER.entries)} gazetteer names.")
+
 load_data()
 
+# Workers hold the SmartRouter model, transit graph and stop arrays, and
+# replay the hot searches from search_log.py as they start
+WARMUP = load_warmup()
+compute_pool = ComputePool.from_env(
+    (METRO_STATIONS, BUS_STOPS, os.path.join(os.path.dirname(__file__), "metro-lines-stations.geojson"), WARMUP)
+)
+
+ranker = PreferenceRanker()
+search_log = SearchLog()
+
+async def run_compute(fn, *args):
+    """Run CPU-bound work in the compute pool, mapping overload to HTTP errors"""
+    try:
+        return await compute_pool.run(fn, *args)
+    except PoolSaturated:
+        raise HTTPException(status_code=503, detail="Routing is busy, please retry")
+    except WorkerCrashed:
+        raise HTTPException(status_code=503, detail="Routing worker restarted, please retry")
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Routing took too long")
+
 def get_coordinates(query):
-    """Fetch coordinates from Nominatim API"""
+    """Resolve from the local gazetteer, falling back to the Nominatim API"""
+    coords = GEOCODER.geocode(query)
+    if coords:
+        return coords
     try:
         url = f"https://nominatim.openstreetmap.org/search?format=json&q={query}&limit=1"
         response = requests.get(url, headers={'User-Agent': 'LastMileApp/1.0'})
@@ -86,33 +141,6 @@ def get_coordinates(query):
         print(f"Geocoding error: {e}")
     return None
 
-def calculate_distance(coord1, coord2):
-    """Haversine formula for distance in km"""
-    R = 6371  # Earth radius in km
-    lat1, lon1 = math.radians(coord1[0]), math.radians(coord1[1])
-    lat2, lon2 = math.radians(coord2[0]), math.radians(coord2[1])
-    dlat = lat2 - lat1
-    dlon = lon2 - lon1
-    a = math.sin(dlat / 2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon / 2)**2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    return R * c
-
-def find_nearest_station(lat, lon, stations):
-    """Find the nearest station (metro or bus) to a given lat/lon"""
-    if not stations:
-        return None, None, float('inf')
-    
-    nearest_station = None
-    min_dist = float('inf')
-    
-    for station in stations:
-        dist = calculate_distance([lat, lon], [station["lat"], station["lon"]])
-        if dist < min_dist:
-            min_dist = dist
-            nearest_station = station
-            
-    return nearest_station, [nearest_station["lat"], nearest_station["lon"]], min_dist
-
 @router.get("/metro-stations")
 async def get_metro_stations():
     return {"stations": METRO_STATIONS}
@@ -121,6 +149,10 @@ async def get_metro_stations():
 async def get_bus_stops():
     return {"stops": BUS_STOPS}
 
+@router.get("/autocomplete")
+async def autocomplete(query: str = Query(..., min_length=1), limit: int = Query(8, ge=1, le=20)):
+    return {"results": GEOCODER.search(query, limit)}
+
 @router.get("/search")
 async def search_routes(
     destination: str = Query(..., min_length=1), 
@@ -128,16 +160,22 @@ async def search_routes(
     s_lat: Optional[float] = None,
     s_lon: Optional[float] = None,
     d_lat: Optional[float] = None,
-    d_lon: Optional[float] = None
+    d_lon: Optional[float] = None,
+    user_id: Optional[str] = None,
+    preference: Optional[str] = None,
+    mode_preference: Optional[str] = None,
+    max_walk: Optional[float] = Query(None, ge=0, allow_inf_nan=False)
 ):
     """
     Search for routes. Uses provided coordinates or geocodes the text.
     """
+    started = time.perf_counter()
+
     # Resolve Start Coordinates
     if s_lat is not None and s_lon is not None:
         start_coords = [s_lat, s_lon]
     else:
-        start_coords = get_coordinates(start)
+        start_coords = await asyncio.to_thread(get_coordinates, start)
         if not start_coords:
             start_coords = LOCATIONS.get(start.lower()) or LOCATIONS.get("indiranagar")
 
@@ -145,7 +183,7 @@ async def search_routes(
     if d_lat is not None and d_lon is not None:
         dest_coords = [d_lat, d_lon]
     else:
-        dest_coords = get_coordinates(destination)
+        dest_coords = await asyncio.to_thread(get_coordinates, destination)
         if not dest_coords:
             dest_coords = LOCATIONS.get(destination.lower()) or LOCATIONS.get("mg road")
             
@@ -171,228 +209,59 @@ async def search_routes(
             print(f"OSRM Distance Error: {e}")
         
         # Fallback: Haversine * 1.3
-        return calculate_distance(coord1, coord2) * 1.3
+        return haversine(coord1, coord2) * 1.3
 
-    total_dist_km = get_road_distance(start_coords, dest_coords)
-    
-    # Find Nearest Metro Stations
-    start_metro, start_metro_coords, start_metro_dist = find_nearest_station(start_coords[0], start_coords[1], METRO_STATIONS)
-    end_metro, end_metro_coords, end_metro_dist = find_nearest_station(dest_coords[0], dest_coords[1], METRO_STATIONS)
-    
-    # Find Nearest Bus Stops
-    start_bus, start_bus_coords, start_bus_dist = find_nearest_station(start_coords[0], start_coords[1], BUS_STOPS)
-    end_bus, end_bus_coords, end_bus_dist = find_nearest_station(dest_coords[0], dest_coords[1], BUS_STOPS)
-
-    metro_viable = False
-    if start_metro and end_metro and start_metro != end_metro:
-        if start_metro_dist < 5 and end_metro_dist < 5:
-            metro_viable = True
-            
-    bus_viable = False
-    common_routes = []
-    if start_bus and end_bus and start_bus != end_bus:
-        if start_bus_dist < 2 and end_bus_dist < 2: # Bus stops usually closer
-            bus_viable = True
-            # Check for common routes
-            start_routes = set(start_bus.get("routes", []))
-            end_routes = set(end_bus.get("routes", []))
-            common_routes = list(start_routes.intersection(end_routes))
-
-    # Generate intermediate points based on direction (for non-metro routes)
-    def get_waypoint(start, end, progress):
-        return [
-            start[0] + (end[0] - start[0]) * progress,
-            start[1] + (end[1] - start[1]) * progress
-        ]
-
-    mid_point = get_waypoint(start_coords, dest_coords, 0.5)
-    
-    # Use actual metro station coords if viable, else mock fallback
-    q1_point = start_metro_coords if metro_viable else get_waypoint(start_coords, dest_coords, 0.25)
-    q3_point = end_metro_coords if metro_viable else get_waypoint(start_coords, dest_coords, 0.75)
-    
-    start_metro_name = start_metro["name"] if metro_viable else "Station A"
-    end_metro_name = end_metro["name"] if metro_viable else "Station B"
-
-    routes = [
-        {
-            "id": 1,
-            "mode": "Uber Moto",
-            "duration": int(total_dist_km * 3) + 5, # Approx 20km/h avg + buffer
-            "cost": int(25 + (total_dist_km * 10)),
-            "safety": "Medium",
-            "ai_score": 8.5,
-            "details": "Fastest in traffic",
-            "segments": [
-                {
-                    "mode": "moto", 
-                    "from": start_coords, 
-                    "to": dest_coords,
-                    "instruction": f"Ride Uber Moto directly to {destination}",
-                    "identifier": "KA-01-EQ-1234"
-                }
-            ]
-        }
-    ]
-
-    if metro_viable:
-        routes.append({
-            "id": 3,
-            "mode": "Metro + Walk",
-            "duration": int(total_dist_km * 2.5) + 15,
-            "cost": int(10 + (total_dist_km * 4)),
-            "safety": "High",
-            "ai_score": 9.2,
-            "details": f"Via {start_metro_name}",
-            "segments": [
-                {
-                    "mode": "walk", 
-                    "from": start_coords, 
-                    "to": q1_point,
-                    "instruction": f"Walk to {start_metro_name}",
-                    "identifier": f"{round(start_metro_dist, 1)} km"
-                },
-                {
-                    "mode": "metro", 
-                    "from": q1_point, 
-                    "to": q3_point,
-                    "instruction": f"Metro to {end_metro_name}",
-                    "identifier": "Purple/Green Line",
-                    "from_stop": start_metro_name,
-                    "to_stop": end_metro_name
-                },
-                {
-                    "mode": "walk", 
-                    "from": q3_point, 
-                    "to": dest_coords,
-                    "instruction": f"Walk to {destination}",
-                    "identifier": f"{round(end_metro_dist, 1)} km"
-                }
-            ]
-        })
-        
-        routes.append({
-            "id": 4,
-            "mode": "Auto + Metro + Auto",
-            "duration": int(total_dist_km * 2) + 10,
-            "cost": int(40 + (total_dist_km * 8)),
-            "safety": "High",
-            "ai_score": 8.8,
-            "details": "Comfortable & Fast",
-            "segments": [
-                {
-                    "mode": "auto", 
-                    "from": start_coords, 
-                    "to": q1_point,
-                    "instruction": f"Take Auto to {start_metro_name}",
-                    "identifier": "Uber Auto"
-                },
-                {
-                    "mode": "metro", 
-                    "from": q1_point, 
-                    "to": q3_point,
-                    "instruction": f"Metro to {end_metro_name}",
-                    "identifier": "Metro",
-                    "from_stop": start_metro_name,
-                    "to_stop": end_metro_name
-                },
-                {
-                    "mode": "auto", 
-                    "from": q3_point, 
-                    "to": dest_coords,
-                    "instruction": f"Take Auto to {destination}",
-                    "identifier": "Ola Auto"
-                }
-            ]
-        })
-    
-    if bus_viable:
-        bus_route_id = common_routes[0] if common_routes else "Any Bus"
-        bus_instruction = f"Take Bus {bus_route_id}" if common_routes else "Take Bus towards destination"
-        
-        routes.append({
-            "id": 5,
-            "mode": "Bus + Walk",
-            "duration": int(total_dist_km * 3.5) + 15, 
-            "cost": int(5 + (total_dist_km * 2)), # Very cheap
-            "safety": "Medium",
-            "ai_score": 8.0 if common_routes else 7.5,
-            "details": f"Via {start_bus['name']}",
-            "segments": [
-                {
-                    "mode": "walk", 
-                    "from": start_coords, 
-                    "to": start_bus_coords,
-                    "instruction": f"Walk to {start_bus['name']}",
-                    "identifier": f"{round(start_bus_dist, 1)} km"
-                },
-                {
-                    "mode": "bus", 
-                    "from": start_bus_coords, 
-                    "to": end_bus_coords,
-                    "instruction": bus_instruction,
-                    "identifier": bus_route_id,
-                    "from_stop": start_bus['name'],
-                    "to_stop": end_bus['name']
-                },
-                {
-                    "mode": "walk", 
-                    "from": end_bus_coords, 
-                    "to": dest_coords,
-                    "instruction": f"Walk to {destination}",
-                    "identifier": f"{round(end_bus_dist, 1)} km"
-                }
-            ]
-        })
-    else:
-        # Fallback generic bus route
-        routes.append({
-            "id": 5,
-            "mode": "Cab + Bus + Walk",
-            "duration": int(total_dist_km * 4) + 10, 
-            "cost": int(30 + (total_dist_km * 5)),
-            "safety": "Medium",
-            "ai_score": 6.5,
-            "details": "Budget friendly long haul",
-            "segments": [
-                {
-                    "mode": "cab", 
-                    "from": start_coords, 
-                    "to": mid_point,
-                    "instruction": "Take Cab to Bus Stop",
-                    "identifier": "Uber Go"
-                },
-                {
-                    "mode": "bus", 
-                    "from": mid_point, 
-                    "to": q3_point,
-                    "instruction": "Take Bus towards Destination",
-                    "identifier": "BMTC",
-                    "from_stop": "Stop A",
-                    "to_stop": "Stop B"
-                },
-                {
-                    "mode": "walk", 
-                    "from": q3_point, 
-                    "to": dest_coords,
-                    "instruction": "Walk to destination",
-                    "identifier": "400m"
-                }
-            ]
-        })
-    
-    # Sort by AI Score descending
-    routes.sort(key=lambda x: x["ai_score"], reverse=True)
+    # OSRM call blocks, so keep it off the event loop
+    total_dist_km = await asyncio.to_thread(get_road_distance, start_coords, dest_coords)
+
+    # Pareto-optimal first mile / trunk / last mile options over nearby stops
+    routes, candidate_stats = await run_compute(candidates_task, start_coords, dest_coords, total_dist_km, destination)
+
+    # Score against the user's learned weights, best first
+    routes = ranker.rank(routes, user_id, preference, mode_preference, max_walk)[:MAX_OPTIONS]
+
+    # Attach precomputed track geometry to metro legs
+    if METRO_GEOMETRY:
+        for route in routes:
+            for segment in route["segments"]:
+                if segment["mode"] == "metro":
+                    track = METRO_GEOMETRY.segment(segment["from"], segment["to"])
+                    if track:
+                        segment.update(track)
     
+    search_log.record(start, destination, start_coords, dest_coords, routes, (time.perf_counter() - started) * 1000)
+
     return {
         "start": start,
         "start_coords": start_coords,
         "destination": destination,
         "destination_coords": dest_coords,
         "total_distance_km": round(total_dist_km, 2),
-        "routes": routes
+        "routes": routes,
+        "candidate_stats": candidate_stats
     }
 
+@router.post("/train")
+async def train_preferences(request: dict):
+    """Store stated preferences as the starting weights for a user"""
+    user_id = request.get("user_id")
+    if not user_id:
+        raise HTTPException(status_code=400, detail="user_id is required")
+    try:
+        ranker.set_preferences(user_id, request.get("priority", "balanced"), request.get("mode", "any"), request.get("maxWalk"))
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="maxWalk must be a non-negative number of km")
+    return {"status": "ok"}
+
+@router.post("/choice")
+async def record_choice(request: dict):
+    """Learn from the route a user picked out of their last search results"""
+    try:
+        learned = ranker.record_choice(request.get("user_id"), int(request["chosen"]))
+    except (KeyError, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Expected user_id and chosen")
+    return {"learned": learned}
+
 @router.get("/namma-yatri/files")
 async def list_namma_yatri_files():
     """List available Namma Yatri data files"""
@@ -416,24 +285,86 @@ async def get_namma_yatri_data(filename: str):
         
     return FileResponse(file_path)
 
-smart_router_instance = SmartRouter()
+traffic_feed = TrafficFeed()
+
+@router.get("/isochrone")
+async def get_isochrone(
+    lat: float,
+    lon: float,
+    minutes: int = Query(30, ge=1, le=120),
+    modes: str = Query("walk,metro")
+):
+    """Everything reachable from (lat, lon) within the time budget"""
+    requested = [m.strip().lower() for m in modes.split(",") if m.strip()]
+    unknown = [m for m in requested if m not in TransitNetwork.MODES]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown modes: {', '.join(unknown)}")
+    return await run_compute(isochrone_task, lat, lon, minutes, requested or ["walk"])
+
+def warm_caches():
+    """Pre-populate this process's geocoder and metro geometry caches from search_log.py output"""
+    if not WARMUP:
+        return
+    for item in WARMUP.get("queries", []):
+        GEOCODER.geocode(item["query"])
+    if METRO_GEOMETRY:
+        for pair in WARMUP.get("metro_pairs", []):
+            METRO_GEOMETRY.segment(pair["from"], pair["to"])
+    print(f"Warmed caches with {len(WARMUP.get('queries', []))} queries and {len(WARMUP.get('metro_pairs', []))} metro pairs.")
+
+@router.on_event("startup")
+async def start_background_services():
+    # Optional JSON-lines file written by an external traffic producer
+    traffic_feed.start(tail_path=os.environ.get("TRAFFIC_FEED_PATH"))
+    search_log.start()
+    ranker.start()
+    await asyncio.gather(compute_pool.warm_up(), asyncio.to_thread(warm_caches))
+
+@router.on_event("shutdown")
+async def stop_background_services():
+    await traffic_feed.stop()
+    await search_log.stop()
+    compute_pool.shutdown()
+    await ranker.stop()
+
+@router.post("/traffic")
+async def push_traffic(observations: List[dict]):
+    """Queue traffic observations from a local producer"""
+    accepted = invalid = 0
+    for obs in observations:
+        try:
+            accepted += traffic_feed.submit(obs)
+        except ValueError:
+            invalid += 1
+    # dropped: valid but the queue was full
+    return {"accepted": accepted, "invalid": invalid, "dropped": len(observations) - accepted - invalid}
+
+@router.get("/traffic")
+async def get_traffic():
+    snapshot = traffic_feed.snapshot()
+    return {
+        "version": snapshot.version,
+        "created_at": snapshot.created_at,
+        "traffic": dict(snapshot.traffic),
+        "density": dict(snapshot.density),
+        "edges": [{"edge": list(k), "traffic": v} for k, v in snapshot.edges.items()]
+    }
 
 @router.post("/smart-route")
 async def get_smart_route(request: dict):
     start = request.get("start", "").lower()
-    end = requests.request.get("end", "").lower()
+    end = request.get("end", "").lower()
 
-    current_traffic = {
-        "koramangala": 8.5, 
-        "indiranagar": 7.0
-    }
-    current_density = {}
+    # Single reference read; the snapshot is immutable for the whole search
+    snapshot = traffic_feed.snapshot()
 
-    result = smart_router_instance.find_optimal_route(
-        start, end, current_traffic, current_density
+    result = await run_compute(
+        smart_route_task, start, end, dict(snapshot.traffic), dict(snapshot.density), dict(snapshot.edges)
     )
 
     if not result:
         return {"error": "Could not find route"}
 
+    if isinstance(result, dict):
+        result["traffic_version"] = snapshot.version
     return result
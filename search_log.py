@@ -0,0 +1,190 @@
+import argparse
+import asyncio
+import glob
+import json
+import os
+import time
+from collections import Counter
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+LOG_DIR = os.environ.get("SEARCH_LOG_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs"))
+WARMUP_PATH = os.environ.get("CACHE_WARMUP_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache_warmup.json"))
+CELL_DEG = 0.01   # ~1.1 km OD cells
+
+# Column name -> NumPy dtype used when batching
+SCHEMA = {
+    "ts": np.float64,
+    "start_query": str,
+    "dest_query": str,
+    "start_lat": np.float32,
+    "start_lon": np.float32,
+    "dest_lat": np.float32,
+    "dest_lon": np.float32,
+    "top_mode": str,
+    "modes": str,          # comma separated modes of the returned options
+    "n_options": np.int16,
+    "metro_legs": str,     # JSON [[from_lat, from_lon, to_lat, to_lon, from_stop, to_stop], ...]
+    "latency_ms": np.float32,
+}
+
+
+def _cells(values):
+    return np.round(np.round(values.astype(np.float64) / CELL_DEG) * CELL_DEG, 4)
+
+
+class SearchLog:
+    """
+    Append-only search log. record() only appends to in-memory columns;
+    a background task flushes full or stale batches to Parquet (NumPy .npz
+    when pyarrow is not installed) from a worker thread, so request
+    handlers never touch the disk.
+    """
+
+    def __init__(self, directory=LOG_DIR, batch_size=2000, flush_interval=10.0, max_buffered=100000):
+        self.directory = directory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered
+        self._columns = {name: [] for name in SCHEMA}
+        self._task = None
+        self._sequence = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self._columns["ts"])
+
+    def record(self, start_query, dest_query, start_coords, dest_coords, routes, latency_ms):
+        if len(self) >= self.max_buffered:
+            # Writer can't keep up; shed load rather than grow without bound
+            self.dropped += 1
+            return
+        metro_legs = [
+            [s["from"][0], s["from"][1], s["to"][0], s["to"][1], s.get("from_stop"), s.get("to_stop")]
+            for r in routes for s in r["segments"] if s["mode"] == "metro"
+        ]
+        row = (
+            time.time(), start_query, dest_query,
+            start_coords[0], start_coords[1], dest_coords[0], dest_coords[1],
+            routes[0]["mode"] if routes else "", ",".join(r["mode"] for r in routes), len(routes),
+            json.dumps(metro_legs) if metro_legs else "", latency_ms,
+        )
+        for column, value in zip(self._columns.values(), row):
+            column.append(value)
+
+    def _take_batch(self):
+        columns, self._columns = self._columns, {name: [] for name in SCHEMA}
+        return columns
+
+    def _write(self, columns):
+        os.makedirs(self.directory, exist_ok=True)
+        self._sequence += 1
+        stem = os.path.join(self.directory, f"search-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{self._sequence}")
+        arrays = {name: np.asarray(values, dtype=SCHEMA[name]) for name, values in columns.items()}
+        if pq is not None:
+            pq.write_table(pa.table(arrays), stem + ".parquet", compression="zstd")
+        else:
+            np.savez_compressed(stem + ".npz", **arrays)
+
+    async def flush(self):
+        if len(self):
+            batch = self._take_batch()
+            try:
+                await asyncio.to_thread(self._write, batch)
+            except Exception as e:
+                print(f"Error writing search log: {e}")
+
+    async def _flush_loop(self):
+        last = time.monotonic()
+        while True:
+            await asyncio.sleep(0.5)
+            if len(self) >= self.batch_size or (len(self) and time.monotonic() - last >= self.flush_interval):
+                await self.flush()
+                last = time.monotonic()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._flush_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+
+def read_logs(directory=LOG_DIR):
+    """All logged searches as a dict of NumPy columns"""
+    parts = []
+    for path in sorted(glob.glob(os.path.join(directory, "search-*"))):
+        if path.endswith(".parquet") and pq is not None:
+            table = pq.read_table(path)
+            parts.append({name: table.column(name).to_numpy(zero_copy_only=False) for name in SCHEMA})
+        elif path.endswith(".npz"):
+            with np.load(path) as data:
+                parts.append({name: data[name] for name in SCHEMA})
+    if not parts:
+        return {name: np.array([], dtype=SCHEMA[name]) for name in SCHEMA}
+    return {name: np.concatenate([p[name] for p in parts]) for name in SCHEMA}
+
+
+def build_warmup(columns, top=200):
+    """Hot OD cells, metro stop pairs and query strings from logged searches"""
+    n = len(columns["ts"])
+    od_cells = Counter()
+    if n:
+        od = np.column_stack([_cells(columns[c]) for c in ("start_lat", "start_lon", "dest_lat", "dest_lon")])
+        unique, counts = np.unique(od, axis=0, return_counts=True)
+        od_cells = Counter({tuple(float(v) for v in row): int(c) for row, c in zip(unique, counts)})
+
+    stop_pairs = Counter()
+    for legs in columns["metro_legs"]:
+        if legs:
+            for leg in json.loads(legs):
+                stop_pairs[tuple(leg)] += 1
+
+    queries = Counter(q.strip().lower() for q in np.concatenate([columns["start_query"], columns["dest_query"]]) if q)
+
+    return {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "searches": int(n),
+        "od_cells": [{"start": [a, b], "dest": [c, d], "count": k} for (a, b, c, d), k in od_cells.most_common(top)],
+        "metro_pairs": [
+            {"from": leg[:2], "to": leg[2:4], "from_stop": leg[4], "to_stop": leg[5], "count": k}
+            for leg, k in stop_pairs.most_common(top)
+        ],
+        "queries": [{"query": q, "count": k} for q, k in queries.most_common(top)],
+    }
+
+
+def load_warmup(path=WARMUP_PATH):
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Error loading cache warm-up list: {e}")
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarise search logs into a cache warm-up list")
+    parser.add_argument("--log-dir", default=LOG_DIR)
+    parser.add_argument("--out", default=WARMUP_PATH)
+    parser.add_argument("--top", type=int, default=200)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    warmup = build_warmup(read_logs(args.log_dir), args.top)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(warmup, f, indent=2)
+    print(f"Analysed {warmup['searches']} searches in {time.perf_counter() - t0:.2f}s")
+    print(f"Hot OD cells: {len(warmup['od_cells'])}, metro pairs: {len(warmup['metro_pairs'])}, "
+          f"queries: {len(warmup['queries'])} -> {args.out}")
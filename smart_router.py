@@ -3,16 +3,38 @@ import pandas as pd
 import heapq
 import math
 import networkx as nx
+import os
 from datetime import datetime
+from model_registry import latest_model_path
+from tree_predictor import TreePredictor
+
+def resolve_model_path():
+    """
+    TRAFFIC_MODEL_PATH wins; otherwise the newest versioned artifact from
+    traffic_train_model.py; otherwise the bundled traffic_xgb.json.
+    """
+    configured = os.environ.get("TRAFFIC_MODEL_PATH")
+    if configured:
+        return configured
+    return latest_model_path() or os.path.join(os.path.dirname(os.path.abspath(__file__)), "traffic_xgb.json")
 
 class SmartRouter:
     def __init__(self):
         self.model = xgb.XGBRegressor()
+        self.fast_model = None
+        self.model_path = resolve_model_path()
         try:
-            self.model.load_model("B:\\EL-1st semester\\EL-PASE-2\\traffic_xgb.json")
-            print("Loaded XGBoost Traffic Model.")
-        except:
-            print("Model not found. Please run train_traffic_model.py first.")
+            self.model.load_model(self.model_path)
+            print(f"Loaded XGBoost Traffic Model from {self.model_path}.")
+        except Exception:
+            print("Model not found. Please run traffic_train_model.py first.")
+
+        # Compiled NumPy evaluator for single-row predictions; optional
+        if os.environ.get("TRAFFIC_FAST_PREDICT", "1") != "0":
+            try:
+                self.fast_model = TreePredictor.from_file(self.model_path)
+            except Exception as e:
+                print(f"Fast predictor unavailable, using XGBoost: {e}")
 
         self.locations = {
             "koramangala": [12.9352, 77.6245],
@@ -63,7 +85,11 @@ class SmartRouter:
         dist = edge_data['distance_km']
         road_type = edge_data['road_type']
         hour = datetime.now().hour
-        
+
+        if self.fast_model is not None:
+            predicted_duration = self.fast_model.predict_one([dist, current_traffic, current_density, hour, road_type])
+            return max(1.0, predicted_duration)
+
         input_data = pd.DataFrame([{
             'distance_km': dist,
             'traffic_index': current_traffic, 
@@ -73,12 +99,15 @@ class SmartRouter:
         }])
         
         predicted_duration = self.model.predict(input_data)[0]
-        return max(1.0, predicted_duration) 
+        return max(1.0, float(predicted_duration))
     
-    def find_optimal_route(self, start_node, end_node, traffic_map, density_map):
+    def find_optimal_route(self, start_node, end_node, traffic_map, density_map, edge_traffic=None):
         """
-        Dijkstra's Algorithm using ML-predicted weights
+        Dijkstra's Algorithm using ML-predicted weights.
+        edge_traffic maps sorted (u, v) pairs to a traffic level and takes
+        precedence over the per-node traffic_map for that edge.
         """
+        edge_traffic = edge_traffic or {}
         if start_node not in self.graph or end_node not in self.graph:
             return None, "Invalid Locations"
 
@@ -105,7 +134,10 @@ class SmartRouter:
 
             for neighbor in self.graph.neighbors(current_node):
                 if neighbor not in visited:
-                    t_level = traffic_map.get(neighbor, 5.0) 
+                    edge_key = (current_node, neighbor) if current_node <= neighbor else (neighbor, current_node)
+                    t_level = edge_traffic.get(edge_key)
+                    if t_level is None:
+                        t_level = traffic_map.get(neighbor, 5.0)
                     p_density = density_map.get(neighbor, 10000)
                     
                     edge_cost = self.predict_edge_weight(current_node, neighbor, t_level, p_density)
@@ -143,4 +175,4 @@ if __name__ == "__main__":
     result = router.find_optimal_route(start, end, traffic_conditions, pop_density)
     print(f"Optimal Route from {start} to {end}:")
     print(f"Path: {' -> '.join(result['path'])}")
-    print(f"Estimated Time: {result['total_duration_mins']} mins")
\ No newline at end of file
+    print(f"Estimated Time: {result['total_duration_mins']} mins")
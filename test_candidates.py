@@ -0,0 +1,69 @@
+import os
+import random
+
+import pytest
+
+from candidates import ROAD_DETOUR, _vector, generate_candidates, haversine, trunk_leg
+
+
+def _stops(rng, n, prefix, with_routes=False):
+    stops = []
+    for i in range(n):
+        stop = {"name": f"{prefix} {i}", "lat": rng.uniform(12.85, 13.05), "lon": rng.uniform(77.50, 77.75)}
+        if with_routes:
+            stop["routes"] = rng.sample(["500D", "335E", "G4", "KIA-9"], 2)
+        stops.append(stop)
+    return stops
+
+
+def _nearest(stops, coords, k):
+    ranked = sorted(((s, haversine(coords, [s["lat"], s["lon"]])) for s in stops), key=lambda item: item[1])
+    return ranked[:k]
+
+
+def _trips(n=150, k=4, seed=11):
+    rng = random.Random(seed)
+    metro, bus = _stops(rng, 60, "Metro"), _stops(rng, 150, "Bus", with_routes=True)
+    for _ in range(n):
+        a = [rng.uniform(12.85, 13.05), rng.uniform(77.50, 77.75)]
+        b = [rng.uniform(12.85, 13.05), rng.uniform(77.50, 77.75)]
+        yield (a, b, haversine(a, b) * ROAD_DETOUR,
+               (_nearest(metro, a, k), _nearest(metro, b, k)), (_nearest(bus, a, k), _nearest(bus, b, k)))
+
+
+def test_pruned_frontier_matches_exhaustive():
+    pruned_any = False
+    for a, b, road_km, metro, bus in _trips():
+        pruned, stats = generate_candidates(a, b, road_km, metro, bus, prune=True)
+        exhaustive, _ = generate_candidates(a, b, road_km, metro, bus, prune=False)
+        assert sorted(map(_vector, pruned)) == sorted(map(_vector, exhaustive))
+        pruned_any |= stats["pruned"] > 0
+    assert pruned_any
+
+
+def test_safer_direct_ride_is_kept():
+    # Auto beats Uber Go on time and fare for short trips; cab survives on risk
+    for a, b, road_km, metro, bus in _trips(n=50):
+        options, _ = generate_candidates(a, b, road_km, metro, bus)
+        assert any(len(legs) == 1 and legs[0].mode == "cab" for legs in options)
+
+
+GEOJSON = os.path.join(os.path.dirname(os.path.abspath(__file__)), "metro-lines-stations.geojson")
+
+
+@pytest.mark.skipif(not os.path.exists(GEOJSON), reason="metro GeoJSON not present")
+def test_cross_line_metro_trunk_uses_track_and_interchange():
+    from isochrone import TransitNetwork
+    from metro_geometry import MetroGeometry
+
+    indiranagar = {"name": "Indiranagar", "lat": 12.978318, "lon": 77.638731}
+    majestic = {"name": "Majestic", "lat": 12.975697, "lon": 77.572967}
+    jayanagar = {"name": "Jayanagar", "lat": 12.929641, "lon": 77.58016}
+    network = TransitNetwork([indiranagar, majestic, jayanagar], [], MetroGeometry.from_geojson(GEOJSON))
+
+    leg = trunk_leg("metro", indiranagar, jayanagar, network)
+    straight = trunk_leg("metro", indiranagar, jayanagar)
+    assert [run["to"]["name"] for run in leg.runs] == ["Majestic", "Jayanagar"]
+    assert leg.km > straight.km * 1.2
+    assert leg.minutes > straight.minutes
+    assert leg.vec[4] == 2
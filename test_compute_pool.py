@@ -0,0 +1,85 @@
+import asyncio
+import os
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from compute_pool import ComputePool, PoolSaturated, WorkerCrashed, _ping
+
+
+# Tasks must be importable by the spawned workers
+def _sleep(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def _crash():
+    os._exit(1)
+
+
+@pytest.fixture
+def pool():
+    pool = ComputePool(([], [], None), kind="process", max_workers=1, max_pending=1, timeout=5.0)
+    yield pool
+    pool.shutdown()
+
+
+def test_saturated_pool_fails_fast(pool):
+    async def scenario():
+        await pool.warm_up()
+        busy = asyncio.ensure_future(pool.run(_sleep, 0.5))
+        await asyncio.sleep(0)
+        with pytest.raises(PoolSaturated):
+            await pool.run(_sleep, 0)
+        assert await busy == 0.5
+        # The slot frees once the worker finishes
+        assert await pool.run(_sleep, 0) == 0
+
+    asyncio.run(scenario())
+
+
+def test_timeout_keeps_counting_until_worker_finishes(pool):
+    async def scenario():
+        await pool.warm_up()
+        with pytest.raises(asyncio.TimeoutError):
+            await pool.run(_sleep, 1.0, timeout=0.1)
+        assert pool.pending == 1
+        with pytest.raises(PoolSaturated):
+            await pool.run(_sleep, 0)
+
+    asyncio.run(scenario())
+
+
+def test_crashed_worker_rebuilds_pool(pool):
+    async def scenario():
+        await pool.warm_up()
+        broken = pool.executor
+        with pytest.raises(WorkerCrashed):
+            await pool.run(_crash)
+        await pool._respawn
+        assert pool.executor is not broken
+        assert await pool.run(_ping) != os.getpid()
+
+    asyncio.run(scenario())
+
+
+class _FailingPool:
+    def __init__(self, error):
+        self.error = error
+
+    async def run(self, fn, *args):
+        raise self.error
+
+
+@pytest.mark.parametrize("error, status", [
+    (PoolSaturated("full"), 503),
+    (WorkerCrashed("died"), 503),
+    (asyncio.TimeoutError(), 504),
+])
+def test_run_compute_maps_pool_errors(monkeypatch, error, status):
+    import routes
+    monkeypatch.setattr(routes, "compute_pool", _FailingPool(error))
+    with pytest.raises(HTTPException) as info:
+        asyncio.run(routes.run_compute(_ping))
+    assert info.value.status_code == status
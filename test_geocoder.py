@@ -0,0 +1,63 @@
+import math
+
+import pytest
+
+from geocoder import MATCH_THRESHOLD, Geocoder
+
+
+def _km(a, b):
+    x = math.radians(b[1] - a[1]) * math.cos(math.radians((a[0] + b[0]) / 2))
+    return 6371 * math.hypot(x, math.radians(b[0] - a[0]))
+
+
+@pytest.fixture(scope="module")
+def gazetteer():
+    from routes import GEOCODER
+    return GEOCODER
+
+
+@pytest.mark.parametrize("query", ["Koramangala 5th block", "Airport", "Hebbal", "Kempegowda International Airport"])
+def test_partial_matches_fall_through_to_nominatim(gazetteer, query):
+    assert gazetteer.geocode(query) is None
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("indiranagar", (12.9784, 77.6408)),
+    ("Indira Nagar", (12.9784, 77.6408)),
+    ("majestic", (12.9757, 77.5730)),
+    ("silk board", (12.9170, 77.6230)),
+    ("koramangala 4th block", (12.9340, 77.6299)),
+    ("kempegowda bus station", (12.9775, 77.5724)),
+])
+def test_confident_matches_resolve_locally(gazetteer, query, expected):
+    coords = gazetteer.geocode(query)
+    assert coords is not None
+    assert _km(coords, expected) < 1.0
+
+
+def test_prefix_match_is_not_confident():
+    geocoder = Geocoder()
+    geocoder.add("Hebbala", 13.04, 77.59, "Bus Stop")
+    geocoder.build()
+    assert geocoder.search("hebbal")[0]["name"] == "Hebbala"
+    assert geocoder.geocode("hebbal") is None
+    assert geocoder.geocode("hebbala") == [13.04, 77.59]
+
+
+def test_type_bonus_does_not_count_towards_confidence():
+    geocoder = Geocoder()
+    # Misspelt query: fuzzy coverage sits just under the threshold
+    geocoder.add("Indiranagar", 12.97, 77.64, "Location")
+    geocoder.build()
+    result = geocoder.search("indranagar")[0]
+    assert result["score"] >= MATCH_THRESHOLD > result["confidence"]
+    assert geocoder.geocode("indranagar") is None
+
+
+def test_every_query_token_must_match():
+    geocoder = Geocoder()
+    geocoder.add("Koramangala 1st Block", 12.93, 77.62, "Bus Stop")
+    geocoder.add("Muneshwara Block 5th Main", 12.94, 77.54, "Bus Stop")
+    geocoder.build()
+    assert geocoder.geocode("koramangala 5th block") is None
+    assert geocoder.geocode("koramangala 1st block") == [12.93, 77.62]
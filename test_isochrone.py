@@ -0,0 +1,82 @@
+import math
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from isochrone import METRO_WAIT_MIN, TransitNetwork, _walk_minutes
+from metro_geometry import MetroGeometry
+
+# Three stations ~2.2 km apart on one east-west line, plus a bus stop
+# near the origin and two road localities further north
+STATIONS = [
+    {"name": "West", "lat": 12.97, "lon": 77.58},
+    {"name": "Centre", "lat": 12.97, "lon": 77.60},
+    {"name": "East", "lat": 12.97, "lon": 77.62},
+]
+STOPS = [{"name": "Bus Stand", "lat": 12.972, "lon": 77.58}]
+LINE = {"name": "Line-1 (Purple)", "color": "purple", "path": [[12.97, 77.58 + i * 0.005] for i in range(9)]}
+ROADS = {"north gate": (13.00, 77.58), "hill top": (13.05, 77.58)}
+
+
+@pytest.fixture
+def network():
+    graph = nx.Graph()
+    graph.add_edge("north gate", "hill top", distance_km=5.5)
+    return TransitNetwork(STATIONS, STOPS, MetroGeometry([LINE], STATIONS), graph, ROADS)
+
+
+def _minutes(result):
+    return {s["name"]: s["minutes"] for s in result["stops"]}
+
+
+def test_reachable_respects_budget(network):
+    best = network.reachable(12.97, 77.58, 12)
+    reached = best[np.isfinite(best)]
+    assert len(reached) and (reached <= 12).all()
+    # Boarding at West costs the wait; Centre is one ride away
+    assert best[0] == pytest.approx(METRO_WAIT_MIN)
+    assert best[1] < 12 and not np.isfinite(best[2])
+
+
+def test_modes_filter_edges(network):
+    walk_only = _minutes(network.isochrone(12.97, 77.58, 20, ["walk"]))
+    with_metro = _minutes(network.isochrone(12.97, 77.58, 20, ["walk", "metro"]))
+    assert "East" not in walk_only
+    assert with_metro["East"] < 20
+
+
+def test_road_mode_uses_road_graph(network):
+    # Walk to the nearer locality, then ride the road edge to the far one
+    walk = _minutes(network.isochrone(13.00, 77.58, 30, ["walk"]))
+    road = _minutes(network.isochrone(13.00, 77.58, 30, ["walk", "road"]))
+    assert "Hill Top" not in walk
+    assert road["Hill Top"] == pytest.approx(5.5 * 1.3 / 20 * 60, abs=0.1)
+
+
+def test_cache_is_keyed_by_cell_budget_and_modes(network):
+    first = network.isochrone(12.9701, 77.5801, 20, ["metro", "walk"])
+    # Same ~550 m cell and same set of modes in another order: cache hit
+    assert network.isochrone(12.9699, 77.5799, 20, ["walk", "metro"]) is first
+    assert network.isochrone(12.9701, 77.5801, 25, ["walk", "metro"]) is not first
+    assert network.isochrone(12.9701, 77.5801, 20, ["walk"]) is not first
+
+
+def test_areas_are_walk_buffers_not_a_hull(network):
+    result = network.isochrone(12.97, 77.58, 15, ["walk", "metro"])
+    centres = {tuple(a["center"]) for a in result["areas"]}
+    assert (12.97, 77.6) in centres
+    # Budget left after riding to Centre bounds that circle's radius
+    centre = next(a for a in result["areas"] if tuple(a["center"]) == (12.97, 77.6))
+    spare = 15 - _minutes(result)["Centre"]
+    assert centre["radius_km"] == pytest.approx(spare / 60 * 4.5 / 1.2, abs=0.01)
+    # A point 2 km off the line, between reached stops, stays uncovered
+    off = (12.952, 77.59)
+    for area in result["areas"]:
+        lat, lon = area["center"]
+        km = math.hypot((lat - off[0]) * 111, (lon - off[1]) * 111 * math.cos(math.radians(lat)))
+        assert km > area["radius_km"]
+
+
+def test_walk_minutes_match_speed():
+    assert _walk_minutes(4.5 / 1.2) == pytest.approx(60)
@@ -0,0 +1,52 @@
+import json
+import os
+
+import pytest
+
+from metro_geometry import MetroGeometry, join_lines
+
+GEOJSON = os.path.join(os.path.dirname(os.path.abspath(__file__)), "metro-lines-stations.geojson")
+
+# Stations on different phases (LineStrings) of the same line
+KENGERI = (12.907963, 77.476466)
+INDIRANAGAR = (12.978318, 77.638731)
+MG_ROAD = (12.975505, 77.606762)
+WHITEFIELD = (12.993819, 77.757732)
+
+
+def test_join_lines_chains_pieces_in_either_direction():
+    lines = [
+        {"name": "Line-1 (Purple): A - B", "color": "purple", "path": [[0.0, 0.0], [0.0, 0.01]]},
+        {"name": "Line-1 (Purple): C - B", "color": "purple", "path": [[0.0, 0.02], [0.0, 0.01]]},
+        {"name": "Line-1 (Purple): D - A", "color": "purple", "path": [[0.0, -0.01], [0.0, 0.0]]},
+        {"name": "Line-3: E - F", "color": "yellow", "path": [[1.0, 1.0], [1.0, 1.01]]},
+    ]
+    joined = join_lines(lines)
+    assert [line["name"] for line in joined] == ["Line-1 (Purple)", "Line-3: E - F"]
+    assert joined[0]["path"] == [[0.0, -0.01], [0.0, 0.0], [0.0, 0.01], [0.0, 0.02]]
+
+
+@pytest.mark.skipif(not os.path.exists(GEOJSON), reason="metro GeoJSON not present")
+@pytest.mark.parametrize("a, b", [(KENGERI, INDIRANAGAR), (WHITEFIELD, MG_ROAD), (KENGERI, WHITEFIELD)])
+def test_segment_spans_line_phases(a, b):
+    track = MetroGeometry.from_geojson(GEOJSON).segment(a, b)
+    assert track is not None
+    assert track["line_color"] == "purple"
+
+
+@pytest.mark.skipif(not os.path.exists(GEOJSON), reason="metro GeoJSON not present")
+@pytest.mark.parametrize("name, color", [("Cubbon Park", "purple"), ("Jayanagar", "green"), ("Shivaji Nagar", "pink")])
+def test_stations_sit_only_on_their_own_line(name, color):
+    geometry = MetroGeometry.from_geojson(GEOJSON)
+    with open(GEOJSON) as f:
+        features = json.load(f)["features"]
+    stations = [
+        {"name": feature["properties"]["Name"], "lat": feature["geometry"]["coordinates"][1], "lon": feature["geometry"]["coordinates"][0]}
+        for feature in features if feature["geometry"]["type"] == "Point"
+    ]
+    colors = {
+        geometry.lines[i]["color"]
+        for i, on_line in enumerate(geometry.station_sequences(stations))
+        for j, _ in on_line if stations[j]["name"] == name
+    }
+    assert colors == {color}
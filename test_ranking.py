@@ -0,0 +1,82 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from ranking import PreferenceRanker
+
+
+def _ranker(tmp_path):
+    return PreferenceRanker(path=str(tmp_path / "prefs.npz"))
+
+
+@pytest.mark.parametrize("max_walk", ["far", "nan", -1, [2]])
+def test_invalid_max_walk_is_rejected(tmp_path, max_walk):
+    ranker = _ranker(tmp_path)
+    with pytest.raises((TypeError, ValueError)):
+        ranker.set_preferences("u1", "speed", "metro", max_walk)
+    assert "u1" not in ranker.index
+
+
+def _routes(*rows):
+    return [
+        {"duration": minutes, "cost": cost, "safety": "Medium", "segments": [{"mode": "metro"}] * (transfers + 1)}
+        for minutes, cost, transfers in rows
+    ]
+
+
+def test_choices_only_learn_for_known_users(tmp_path):
+    ranker = _ranker(tmp_path)
+    ranker.rank(_routes((30, 50, 0), (45, 20, 1)), "stranger")
+    assert not ranker.record_choice("stranger", 0)
+    assert ranker.index == {}
+
+    ranker.set_preferences("u1", "cost", "any", "1.5")
+    assert not ranker.record_choice("u1", 0)
+    before = ranker.weights[ranker.index["u1"]].copy()
+    ranked = ranker.rank(_routes((30, 50, 0), (45, 20, 1)), "u1")
+    assert ranker.record_choice("u1", 1)
+    assert not np.array_equal(before, ranker.weights[ranker.index["u1"]])
+    # Each ranking is learned from once, and out-of-range picks are ignored
+    assert not ranker.record_choice("u1", 0)
+    ranker.rank(ranked, "u1")
+    assert not ranker.record_choice("u1", 5)
+
+
+def test_choice_learns_from_server_side_features(tmp_path):
+    ranker = _ranker(tmp_path)
+    ranker.set_preferences("u1", "speed", "any", None)
+    routes = ranker.rank(_routes((1e39, 1, 1), (45, 20, 1)), "u1")
+    # Client-supplied features no longer reach the weights
+    for route in routes:
+        route["features"] = [float("nan")] * 5
+    try:
+        ranker.record_choice("u1", 0)
+    except ValueError:
+        pass
+    assert np.isfinite(ranker.weights[ranker.index["u1"]]).all()
+    assert np.isfinite(ranker.rank(_routes((30, 50, 0)), "u1")[0]["ai_score"])
+
+
+def test_flush_persists_changes(tmp_path):
+    ranker = _ranker(tmp_path)
+    ranker.set_preferences("u1", "speed", "metro", 2)
+    asyncio.run(ranker.flush())
+    assert not ranker.dirty
+
+    reloaded = _ranker(tmp_path)
+    row = reloaded.index["u1"]
+    assert reloaded.max_walk[row] == 2.0
+    np.testing.assert_array_equal(reloaded.weights[row], ranker.weights[row])
+
+
+@pytest.mark.parametrize("max_walk", ["nan", "inf", "-1"])
+def test_search_rejects_invalid_max_walk(max_walk):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    import routes
+
+    app = FastAPI()
+    app.include_router(routes.router, prefix="/api")
+    response = TestClient(app).get("/api/search", params={"destination": "MG Road", "max_walk": max_walk})
+    assert response.status_code == 422
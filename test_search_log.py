@@ -0,0 +1,63 @@
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+import compute_pool
+from isochrone import TransitNetwork
+from metro_geometry import MetroGeometry
+from search_log import SearchLog, build_warmup, read_logs
+
+STATIONS = [
+    {"name": "West", "lat": 12.97, "lon": 77.58},
+    {"name": "Centre", "lat": 12.97, "lon": 77.60},
+    {"name": "East", "lat": 12.97, "lon": 77.62},
+]
+LINE = {"name": "Line-1 (Purple)", "color": "purple", "path": [[12.97, 77.58 + i * 0.005] for i in range(9)]}
+
+
+def _route(mode, from_station, to_station):
+    segments = [{"mode": "walk", "from": [12.968, 77.579], "to": [from_station["lat"], from_station["lon"]]}]
+    if mode == "metro":
+        segments.append({
+            "mode": "metro", "from": [from_station["lat"], from_station["lon"]], "to": [to_station["lat"], to_station["lon"]],
+            "from_stop": from_station["name"], "to_stop": to_station["name"],
+        })
+    return {"mode": mode, "segments": segments}
+
+
+@pytest.fixture
+def warmup(tmp_path):
+    log = SearchLog(directory=str(tmp_path))
+    for _ in range(3):
+        log.record("Home", "Office ", [12.968, 77.579], [12.971, 77.621], [_route("metro", STATIONS[0], STATIONS[2])], 12.0)
+    log.record("home", "Mall", [12.968, 77.579], [12.95, 77.60], [_route("cab", STATIONS[0], STATIONS[0])], 8.0)
+    asyncio.run(log.flush())
+    assert len(log) == 0
+    # As written to and loaded from cache_warmup.json
+    return json.loads(json.dumps(build_warmup(read_logs(str(tmp_path)))))
+
+
+def test_logged_searches_round_trip_to_warmup(warmup):
+    assert warmup["searches"] == 4
+    assert warmup["od_cells"][0] == {"start": [12.97, 77.58], "dest": [12.97, 77.62], "count": 3}
+    assert warmup["metro_pairs"] == [
+        {"from": [12.97, 77.58], "to": [12.97, 77.62], "from_stop": "West", "to_stop": "East", "count": 3}
+    ]
+    assert warmup["queries"][0] == {"query": "home", "count": 4}
+    assert {"query": "office", "count": 3} in warmup["queries"]
+
+
+def test_workers_replay_hot_searches(monkeypatch, warmup):
+    network = TransitNetwork(STATIONS, [], MetroGeometry([LINE], STATIONS))
+    monkeypatch.setattr(compute_pool, "_STATE", {
+        "network": network,
+        "metro": (STATIONS, np.array([[s["lat"], s["lon"]] for s in STATIONS])),
+        "bus": ([], np.zeros((0, 2))),
+    })
+    compute_pool.warm_worker(warmup)
+    west, east = network.metro_index[(12.97, 77.58)], network.metro_index[(12.97, 77.62)]
+    assert (west, east) in network._metro_trips
+    # The OD cells' nearby stations are priced too, beyond the logged pair
+    assert len(network._metro_trips) > 1
@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+from traffic_feed import TrafficFeed, _RollingMean
+
+
+def test_non_finite_values_are_dropped():
+    feed = TrafficFeed()
+    assert not feed.ingest({"node": "koramangala", "traffic": "nan"})
+    assert not feed.ingest({"node": "koramangala", "traffic": "inf"})
+    assert not feed.ingest({"node": "koramangala", "traffic": 5, "density": float("nan")})
+    assert not feed.ingest({"edge": ["koramangala", "hsr layout"], "traffic": "-inf"})
+    assert feed.dropped == 4
+
+    assert feed.ingest({"node": "koramangala", "traffic": 6})
+    snap = feed.publish()
+    assert dict(snap.traffic) == {"koramangala": 6.0}
+    json.dumps(dict(snap.traffic), allow_nan=False)
+
+
+def test_edge_must_be_a_pair():
+    feed = TrafficFeed()
+    assert not feed.ingest({"edge": "ab", "traffic": 5})
+    assert not feed.ingest({"edge": ["a", "b", "c"], "traffic": 5})
+    assert feed.ingest({"edge": ["HSR Layout", "Koramangala"], "traffic": 5})
+    assert dict(feed.publish().edges) == {("hsr layout", "koramangala"): 5.0}
+
+
+def test_window_total_resets_when_empty():
+    window = _RollingMean()
+    for value in (0.1, 0.2, 0.3):
+        window.add(100, value)
+    window.evict(cutoff=200)
+    assert window.mean() is None and window.total == 0.0
+    window.add(200, 4.0)
+    assert window.mean() == 4.0
+
+
+def test_bad_timestamps_cannot_pin_the_window():
+    feed = TrafficFeed(window_seconds=300)
+    assert not feed.ingest({"node": "k", "traffic": 5, "ts": "nan"}, now=1000)
+    assert not feed.ingest({"node": "k", "traffic": 5, "ts": 600}, now=1000)
+
+    # A future ts is windowed by arrival, so it expires like any other sample
+    assert feed.ingest({"node": "k", "traffic": 5, "ts": 1e9}, now=1000)
+    assert feed.ingest({"node": "k", "traffic": 1}, now=1200)
+    assert dict(feed.publish(now=1350).traffic) == {"k": 1.0}
+    assert feed.publish(now=1600).traffic == {}
+
+
+def test_late_sample_expires_in_order():
+    feed = TrafficFeed(window_seconds=300)
+    feed.ingest({"node": "k", "traffic": 2}, now=1000)
+    # Stamped earlier than the previous sample but still inside the window
+    feed.ingest({"node": "k", "traffic": 4, "ts": 900}, now=1100)
+    assert [ts for ts, _ in feed._traffic["k"].samples] == [1000, 1100]
+    assert dict(feed.publish(now=1350).traffic) == {"k": 4.0}
+
+
+def test_submit_rejects_invalid_before_queueing():
+    feed = TrafficFeed()
+    assert feed.submit({"node": "koramangala", "traffic": 9})
+    with pytest.raises(ValueError):
+        feed.submit({"bad": 1})
+    with pytest.raises(ValueError):
+        feed.submit({"node": "koramangala"})
+    assert feed.queue.qsize() == 1
@@ -0,0 +1,56 @@
+import os
+
+import numpy as np
+import pytest
+import xgboost as xgb
+
+from traffic_train_model import FEATURES, generate_traffic_chunk
+from tree_predictor import TreePredictor
+
+BUNDLED_MODEL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "traffic_xgb.json")
+
+
+def _rows(n=500, seed=0):
+    X, _ = generate_traffic_chunk(n, np.random.default_rng(seed))
+    return X
+
+
+def _assert_parity(path, X):
+    booster = xgb.Booster()
+    booster.load_model(path)
+    predictor = TreePredictor.from_file(path)
+    expected = booster.predict(xgb.DMatrix(X, feature_names=predictor.feature_names or None))
+
+    np.testing.assert_allclose(predictor.predict(X), expected, rtol=1e-5, atol=1e-3)
+    single = np.array([predictor.predict_one(row) for row in X[:50]])
+    np.testing.assert_allclose(single, expected[:50], rtol=1e-5, atol=1e-3)
+
+
+@pytest.mark.skipif(not os.path.exists(BUNDLED_MODEL), reason="bundled model not present")
+def test_bundled_model_matches_xgboost():
+    _assert_parity(BUNDLED_MODEL, _rows())
+
+
+def test_missing_values_follow_default_direction(tmp_path):
+    X, y = generate_traffic_chunk(2000, np.random.default_rng(1))
+    X[::7, 1] = np.nan
+    booster = xgb.train(
+        {"max_depth": 5, "objective": "reg:squarederror"},
+        xgb.DMatrix(X, label=y, feature_names=FEATURES),
+        num_boost_round=20,
+    )
+    path = str(tmp_path / "model.json")
+    booster.save_model(path)
+
+    X_test = _rows(seed=2)
+    X_test[::3, 1] = np.nan
+    _assert_parity(path, X_test)
+
+
+def test_rejects_unsupported_objective(tmp_path):
+    X, _ = generate_traffic_chunk(200, np.random.default_rng(3))
+    booster = xgb.train({"objective": "binary:logistic"}, xgb.DMatrix(X, label=X[:, 4] > 2), num_boost_round=2)
+    path = str(tmp_path / "logistic.json")
+    booster.save_model(path)
+    with pytest.raises(ValueError):
+        TreePredictor.from_file(path)
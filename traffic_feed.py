@@ -0,0 +1,264 @@
+import asyncio
+import json
+import math
+import os
+import time
+from collections import deque
+from types import MappingProxyType
+
+# Rolling window length for traffic observations (seconds)
+WINDOW_SECONDS = 300
+# How often the aggregated view is republished (seconds)
+PUBLISH_INTERVAL = 1.0
+
+_EMPTY = MappingProxyType({})
+
+
+class TrafficSnapshot:
+    """Immutable, versioned view of the rolling traffic aggregates"""
+    __slots__ = ("version", "created_at", "traffic", "density", "edges")
+
+    def __init__(self, version, traffic, density, edges):
+        self.version = version
+        self.created_at = time.time()
+        self.traffic = traffic
+        self.density = density
+        self.edges = edges
+
+
+def _finite(value):
+    # float() accepts "nan"/"inf", which would poison a window's running total
+    value = float(value)
+    if not math.isfinite(value):
+        raise ValueError(f"non-finite value {value!r}")
+    return value
+
+
+class _RollingMean:
+    """Running mean over a time window; O(1) amortised per update"""
+    __slots__ = ("samples", "total")
+
+    def __init__(self):
+        self.samples = deque()
+        self.total = 0.0
+
+    def add(self, ts, value):
+        self.samples.append((ts, value))
+        self.total += value
+
+    def evict(self, cutoff):
+        samples = self.samples
+        while samples and samples[0][0] < cutoff:
+            self.total -= samples.popleft()[1]
+        if not samples:
+            # Reset rather than carry subtraction drift into the next window
+            self.total = 0.0
+
+    def mean(self):
+        if not self.samples:
+            return None
+        return self.total / len(self.samples)
+
+
+class TrafficFeed:
+    """
+    Aggregates a stream of traffic observations into per-node and per-edge
+    rolling windows and periodically publishes a TrafficSnapshot.
+
+    Observations are dicts like:
+        {"node": "koramangala", "traffic": 8.5, "density": 25000, "ts": 1700000000}
+        {"edge": ["koramangala", "hsr layout"], "traffic": 6.0}
+
+    Windows are keyed by arrival time so samples stay in order; a "ts"
+    only serves to drop observations already older than the window.
+    Readers call snapshot() and get the latest published object; publishing
+    swaps a single reference so readers never need a lock.
+    """
+
+    def __init__(self, window_seconds=WINDOW_SECONDS, publish_interval=PUBLISH_INTERVAL):
+        self.window_seconds = window_seconds
+        self.publish_interval = publish_interval
+        self._traffic = {}
+        self._density = {}
+        self._edges = {}
+        self._windows = {"traffic": self._traffic, "density": self._density, "edges": self._edges}
+        self._dirty = set()
+        self._snapshot = TrafficSnapshot(0, _EMPTY, _EMPTY, _EMPTY)
+        self.queue = asyncio.Queue(maxsize=100000)
+        self._tasks = []
+        self.dropped = 0
+
+    def snapshot(self):
+        return self._snapshot
+
+    def parse(self, obs, now=None):
+        """
+        Validate an observation into [(kind, key, value), ...]. Raises
+        ValueError if it is malformed or older than the window.
+        """
+        try:
+            if obs.get("ts") is not None:
+                ts = _finite(obs["ts"])
+                if ts < (now or time.time()) - self.window_seconds:
+                    raise ValueError(f"observation from {ts} is older than the window")
+            if "edge" in obs:
+                edge = obs["edge"]
+                if not isinstance(edge, (list, tuple)) or len(edge) != 2:
+                    raise ValueError("edge must be a [from, to] pair")
+                u, v = edge[0].lower(), edge[1].lower()
+                return [("edges", (u, v) if u <= v else (v, u), _finite(obs["traffic"]))]
+
+            node = obs["node"].lower()
+            records = [(kind, node, _finite(obs[kind])) for kind in ("traffic", "density") if obs.get(kind) is not None]
+            if not records:
+                raise ValueError("observation has neither traffic nor density")
+            return records
+        except (KeyError, TypeError, AttributeError) as e:
+            raise ValueError(f"malformed observation: {e!r}") from e
+
+    def ingest(self, obs, now=None):
+        """Record a single observation. Returns False if it was malformed."""
+        now = now or time.time()
+        try:
+            records = self.parse(obs, now)
+        except ValueError:
+            self.dropped += 1
+            return False
+        for kind, key, value in records:
+            self._add(kind, key, now, value)
+        return True
+
+    def ingest_many(self, observations):
+        return sum(1 for obs in observations if self.ingest(obs))
+
+    def _add(self, kind, key, ts, value):
+        windows = self._windows[kind]
+        window = windows.get(key)
+        if window is None:
+            window = windows[key] = _RollingMean()
+        window.add(ts, value)
+        self._dirty.add((kind, key))
+
+    def publish(self, now=None):
+        """Evict expired samples and publish a new snapshot of changed keys"""
+        now = now or time.time()
+        cutoff = now - self.window_seconds
+        current = self._snapshot
+
+        # Expired samples can change a mean even without new data
+        for kind, windows in (("traffic", self._traffic), ("density", self._density), ("edges", self._edges)):
+            for key, window in windows.items():
+                if window.samples and window.samples[0][0] < cutoff:
+                    self._dirty.add((kind, key))
+
+        if not self._dirty:
+            return current
+
+        views = {"traffic": dict(current.traffic), "density": dict(current.density), "edges": dict(current.edges)}
+        sources = self._windows
+        for kind, key in self._dirty:
+            window = sources[kind][key]
+            window.evict(cutoff)
+            mean = window.mean()
+            if mean is None:
+                views[kind].pop(key, None)
+                del sources[kind][key]
+            else:
+                views[kind][key] = round(mean, 3)
+        self._dirty.clear()
+
+        self._snapshot = TrafficSnapshot(
+            current.version + 1,
+            MappingProxyType(views["traffic"]),
+            MappingProxyType(views["density"]),
+            MappingProxyType(views["edges"]),
+        )
+        return self._snapshot
+
+    async def consume_queue(self, batch_size=1000):
+        """Drain the queue in batches so producers never wait on the router"""
+        while True:
+            obs = await self.queue.get()
+            batch = [obs]
+            while len(batch) < batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            self.ingest_many(batch)
+
+    async def tail_file(self, path, poll_interval=0.5):
+        """Follow a JSON-lines file (one observation per line), like tail -f"""
+        while not os.path.exists(path):
+            await asyncio.sleep(poll_interval)
+        with open(path, "r", encoding="utf-8") as f:
+            f.seek(0, os.SEEK_END)
+            pending = ""
+            while True:
+                chunk = f.read()
+                if not chunk:
+                    await asyncio.sleep(poll_interval)
+                    continue
+                pending += chunk
+                lines = pending.split("\n")
+                pending = lines.pop()
+                batch = []
+                for line in lines:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        batch.append(json.loads(line))
+                    except ValueError:
+                        self.dropped += 1
+                self.ingest_many(batch)
+
+    async def publish_loop(self):
+        while True:
+            await asyncio.sleep(self.publish_interval)
+            self.publish()
+
+    def submit(self, obs):
+        """
+        Non-blocking enqueue for local producers. Raises ValueError for a
+        malformed observation; returns False when the queue is full.
+        """
+        try:
+            self.parse(obs)
+        except ValueError:
+            self.dropped += 1
+            raise
+        try:
+            self.queue.put_nowait(obs)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+
+    def start(self, tail_path=None):
+        """Start background consumer/publisher tasks on the running loop"""
+        if self._tasks:
+            return
+        loop = asyncio.get_running_loop()
+        self._tasks.append(loop.create_task(self.consume_queue()))
+        self._tasks.append(loop.create_task(self.publish_loop()))
+        if tail_path:
+            self._tasks.append(loop.create_task(self.tail_file(tail_path)))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+if __name__ == "__main__":
+    import random
+
+    feed = TrafficFeed()
+    nodes = ["koramangala", "indiranagar", "hsr layout", "majestic", "mg road"]
+    n = 200000
+    t0 = time.perf_counter()
+    for _ in range(n):
+        feed.ingest({"node": random.choice(nodes), "traffic": random.uniform(0, 10)})
+    snap = feed.publish()
+    elapsed = time.perf_counter() - t0
+    print(f"Ingested {n} observations in {elapsed:.2f}s ({n / elapsed:,.0f}/s)")
+    print(f"Snapshot v{snap.version}: {dict(snap.traffic)}")
@@ -1,62 +1,124 @@
+import argparse
+import json
+import os
+import time
 import pandas as pd
 import numpy as np
 import xgboost as xgb
-import pickle
-import random
-
-def generate_traffic_data(n_samples=5000):
-    data = []
-    
-    for _ in range(n_samples):
-        distance_km = round(random.uniform(0.5, 15.0), 2)
-        traffic_index = round(random.uniform(0, 10), 1) 
-        pop_density = round(random.uniform(1000, 30000), 0) 
-        hour_of_day = random.randint(0, 23)
-        road_type = random.choice([1, 2, 3]) 
-
-        if road_type == 3: base_speed = 60 
-        elif road_type == 1: base_speed = 40 
-        else: base_speed = 25 
-        
-        traffic_factor = 1 + (traffic_index / 5.0) 
-        density_factor = 1 + (pop_density / 100000.0) 
-
-        duration_mins = (distance_km / base_speed) * 60 * traffic_factor * density_factor
-        duration_mins = duration_mins * random.uniform(0.9, 1.1) 
-        
-        data.append({
-            "distance_km": distance_km,
-            "traffic_index": traffic_index,
-            "pop_density": pop_density,
-            "hour_of_day": hour_of_day,
-            "road_type": road_type,
-            "duration_mins": round(duration_mins, 2)
-        })
-        
-    return pd.DataFrame(data)
+from model_registry import MODEL_DIR, next_model_version
+
+FEATURES = ['distance_km', 'traffic_index', 'pop_density', 'hour_of_day', 'road_type']
+TARGET = 'duration_mins'
+
+def generate_traffic_chunk(n_samples, rng):
+    """Vectorised synthetic traffic rows; returns (X, y) as float32 arrays"""
+    distance_km = np.round(rng.uniform(0.5, 15.0, n_samples), 2)
+    traffic_index = np.round(rng.uniform(0, 10, n_samples), 1)
+    pop_density = np.round(rng.uniform(1000, 30000, n_samples), 0)
+    hour_of_day = rng.integers(0, 24, n_samples)
+    road_type = rng.integers(1, 4, n_samples)
+
+    # road_type 3 = highway, 1 = arterial, 2 = local
+    base_speed = np.select([road_type == 3, road_type == 1], [60, 40], default=25)
+
+    traffic_factor = 1 + (traffic_index / 5.0)
+    density_factor = 1 + (pop_density / 100000.0)
+
+    duration_mins = (distance_km / base_speed) * 60 * traffic_factor * density_factor
+    duration_mins = np.round(duration_mins * rng.uniform(0.9, 1.1, n_samples), 2)
+
+    X = np.column_stack([distance_km, traffic_index, pop_density, hour_of_day, road_type]).astype(np.float32)
+    return X, duration_mins.astype(np.float32)
+
+def generate_traffic_data(n_samples=5000, seed=None):
+    X, y = generate_traffic_chunk(n_samples, np.random.default_rng(seed))
+    df = pd.DataFrame(X, columns=FEATURES)
+    df[TARGET] = y
+    return df
+
+class TrafficChunkIter(xgb.DataIter):
+    """
+    Streams synthetic chunks into a QuantileDMatrix so millions of rows never
+    have to sit in memory at once. Each chunk is seeded from (seed, index),
+    so repeated passes over the iterator see identical data.
+    """
+
+    def __init__(self, n_samples, chunk_size, seed):
+        self.n_samples = n_samples
+        self.chunk_size = chunk_size
+        self.seed = seed
+        self._index = 0
+        super().__init__()
+
+    def next(self, input_data):
+        start = self._index * self.chunk_size
+        if start >= self.n_samples:
+            return False
+        n = min(self.chunk_size, self.n_samples - start)
+        X, y = generate_traffic_chunk(n, np.random.default_rng([self.seed, self._index]))
+        input_data(data=X, label=y, feature_names=FEATURES)
+        self._index += 1
+        return True
+
+    def reset(self):
+        self._index = 0
 
 # 2. Train XGBoost Model
-def train_xgboost():
-    print("Generating synthetic traffic data...")
-    df = generate_traffic_data()
-    
-    X = df[['distance_km', 'traffic_index', 'pop_density', 'hour_of_day', 'road_type']]
-    y = df['duration_mins']
-    
+def train_xgboost(n_samples=1_000_000, chunk_size=100_000, n_estimators=100, nthread=-1, seed=42, model_dir=MODEL_DIR):
+    print(f"Streaming {n_samples:,} synthetic traffic rows in chunks of {chunk_size:,}...")
+    t0 = time.perf_counter()
+    dtrain = xgb.QuantileDMatrix(TrafficChunkIter(n_samples, chunk_size, seed), nthread=nthread)
+
+    # Held-out rows from a different seed
+    X_val, y_val = generate_traffic_chunk(min(n_samples // 10, 200_000) or 1000, np.random.default_rng(seed + 1))
+    dval = xgb.QuantileDMatrix(X_val, label=y_val, feature_names=FEATURES, ref=dtrain, nthread=nthread)
+    print(f"Built training matrix in {time.perf_counter() - t0:.1f}s")
+
     print("Training XGBoost Regressor...")
-    model = xgb.XGBRegressor(
-        objective='reg:squarederror',
-        n_estimators=100,
-        learning_rate=0.1,
-        max_depth=5
-    )
-    model.fit(X, y)
-    
-    score = model.score(X, y)
-    print(f"Model R2 Score: {score:.4f}")
-    
-    model.save_model("traffic_xgb.json")
-    print("Model saved to traffic_xgb.json")
+    params = {
+        'objective': 'reg:squarederror',
+        'tree_method': 'hist',
+        'learning_rate': 0.1,
+        'max_depth': 5,
+        'nthread': nthread,
+    }
+    t0 = time.perf_counter()
+    booster = xgb.train(params, dtrain, num_boost_round=n_estimators)
+    train_secs = time.perf_counter() - t0
+
+    pred = booster.predict(dval)
+    r2 = 1 - np.sum((y_val - pred) ** 2) / np.sum((y_val - y_val.mean()) ** 2)
+    print(f"Model R2 Score (held-out): {r2:.4f} (trained in {train_secs:.1f}s)")
+
+    os.makedirs(model_dir, exist_ok=True)
+    version = next_model_version(model_dir)
+    model_path = os.path.join(model_dir, f"traffic_xgb_v{version}.json")
+    booster.save_model(model_path)
+
+    metadata = {
+        "version": version,
+        "features": FEATURES,
+        "n_samples": n_samples,
+        "n_estimators": n_estimators,
+        "r2_holdout": round(float(r2), 4),
+        "train_seconds": round(train_secs, 2),
+        "xgboost_version": xgb.__version__,
+        "trained_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    with open(os.path.join(model_dir, f"traffic_xgb_v{version}.meta.json"), "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=2)
+
+    print(f"Model saved to {model_path}")
+    return model_path
 
 if __name__ == "__main__":
-    train_xgboost()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Train the SmartRouter traffic model")
+    parser.add_argument("--samples", type=int, default=1_000_000)
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--estimators", type=int, default=100)
+    parser.add_argument("--threads", type=int, default=-1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    args = parser.parse_args()
+
+    train_xgboost(args.samples, args.chunk_size, args.estimators, args.threads, args.seed, args.model_dir)
@@ -0,0 +1,140 @@
+import json
+import numpy as np
+
+# Objectives whose prediction is the raw margin (no link function)
+IDENTITY_OBJECTIVES = {"reg:squarederror", "reg:absoluteerror", "reg:pseudohubererror", "reg:squaredlogerror"}
+
+
+def _parse_base_score(value):
+    # Newer XGBoost writes "[2.9773373E1]", older versions a bare number
+    return float(str(value).strip("[]"))
+
+
+class TreePredictor:
+    """
+    Pure-NumPy evaluator for a saved XGBoost gbtree model (JSON format).
+
+    All trees are padded into (n_trees, max_nodes) arrays so a prediction is
+    max_depth vectorised steps instead of building a DataFrame and going
+    through the XGBoost C API. Intended for low-latency single-row inference.
+    """
+
+    def __init__(self, model_json):
+        learner = model_json["learner"]
+        objective = learner["objective"]["name"]
+        if objective not in IDENTITY_OBJECTIVES:
+            raise ValueError(f"Unsupported objective for TreePredictor: {objective}")
+        if learner["gradient_booster"]["name"] != "gbtree":
+            raise ValueError("TreePredictor only supports gbtree models")
+
+        self.feature_names = learner.get("feature_names") or []
+        self.base_score = np.float32(_parse_base_score(learner["learner_model_param"]["base_score"]))
+
+        trees = learner["gradient_booster"]["model"]["trees"]
+        n_trees = len(trees)
+        max_nodes = max(len(t["left_children"]) for t in trees)
+
+        self.left = np.zeros((n_trees, max_nodes), dtype=np.int32)
+        self.right = np.zeros((n_trees, max_nodes), dtype=np.int32)
+        self.feature = np.zeros((n_trees, max_nodes), dtype=np.int32)
+        self.threshold = np.zeros((n_trees, max_nodes), dtype=np.float32)
+        self.default_left = np.zeros((n_trees, max_nodes), dtype=bool)
+
+        for i, t in enumerate(trees):
+            n = len(t["left_children"])
+            left = np.asarray(t["left_children"], dtype=np.int32)
+            leaf = left == -1
+            # Leaves point at themselves so extra steps are no-ops
+            self.left[i, :n] = np.where(leaf, np.arange(n), left)
+            self.right[i, :n] = np.where(leaf, np.arange(n), t["right_children"])
+            self.feature[i, :n] = t["split_indices"]
+            # For leaves, split_conditions holds the leaf value
+            self.threshold[i, :n] = t["split_conditions"]
+            self.default_left[i, :n] = np.asarray(t["default_left"], dtype=bool)
+
+        self.depth = self._max_depth(trees)
+        self.tree_ids = np.arange(n_trees)
+
+        # Flattened copies with global node ids for the single-row path
+        offsets = (self.tree_ids * max_nodes).astype(np.int32)
+        self._roots = offsets
+        self._flat_left = (self.left + offsets[:, None]).ravel()
+        self._flat_right = (self.right + offsets[:, None]).ravel()
+        self._flat_feature = self.feature.ravel()
+        self._flat_threshold = self.threshold.ravel()
+        self._flat_default_left = self.default_left.ravel()
+
+    @staticmethod
+    def _max_depth(trees):
+        depth = 0
+        for t in trees:
+            stack = [(0, 0)]
+            while stack:
+                node, d = stack.pop()
+                if t["left_children"][node] == -1:
+                    depth = max(depth, d)
+                else:
+                    stack.append((t["left_children"][node], d + 1))
+                    stack.append((t["right_children"][node], d + 1))
+        return depth
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def predict(self, X):
+        """Predict for a 2D array of shape (n_rows, n_features)"""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        rows = np.arange(X.shape[0])[:, None]
+        trees = self.tree_ids[None, :]
+        node = np.zeros((X.shape[0], len(self.tree_ids)), dtype=np.int32)
+
+        for _ in range(self.depth):
+            value = X[rows, self.feature[trees, node]]
+            go_left = np.where(np.isnan(value), self.default_left[trees, node], value < self.threshold[trees, node])
+            node = np.where(go_left, self.left[trees, node], self.right[trees, node])
+
+        return self.base_score + self.threshold[trees, node].sum(axis=1, dtype=np.float32)
+
+    def predict_one(self, row):
+        """Predict for a single feature vector (list in feature_names order)"""
+        x = np.asarray(row, dtype=np.float32)
+        threshold = self._flat_threshold
+        node = self._roots
+        for _ in range(self.depth):
+            value = x[self._flat_feature[node]]
+            go_left = value < threshold[node]
+            missing = np.isnan(value)
+            if missing.any():
+                go_left = np.where(missing, self._flat_default_left[node], go_left)
+            node = np.where(go_left, self._flat_left[node], self._flat_right[node])
+        return float(self.base_score + threshold[node].sum(dtype=np.float32))
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    import xgboost as xgb
+
+    path = sys.argv[1] if len(sys.argv) > 1 else "traffic_xgb.json"
+    predictor = TreePredictor.from_file(path)
+    booster = xgb.Booster()
+    booster.load_model(path)
+
+    rng = np.random.default_rng(0)
+    X = np.column_stack([
+        rng.uniform(0.5, 15.0, 1000), rng.uniform(0, 10, 1000), rng.uniform(1000, 30000, 1000),
+        rng.integers(0, 24, 1000), rng.integers(1, 4, 1000)
+    ]).astype(np.float32)
+
+    expected = booster.predict(xgb.DMatrix(X, feature_names=predictor.feature_names or None))
+    actual = predictor.predict(X)
+    print(f"Max abs diff vs XGBoost: {np.abs(expected - actual).max():.6f}")
+
+    t0 = time.perf_counter()
+    for row in X:
+        predictor.predict_one(row)
+    print(f"TreePredictor single-row: {(time.perf_counter() - t0) / len(X) * 1e6:.1f} us/row")